@@ -1,133 +1,145 @@
-import tkinter as tk
+import startup_timing
 import random
 import time
-from tkinter import messagebox
 import math
-import json
+from blackjack_models import Deck, Player, Dealer, AIPlayer, calculate_hand_value
+from blackjack_models import OUTCOME_LOSS, OUTCOME_WIN, OUTCOME_PUSH, OUTCOME_BLACKJACK, OUTCOME_BUST, OUTCOME_NAMES
+from leaderboard_store import LeaderboardStore
+from achievements import record_achievement, render_achievement
+from theme_registry import ThemeRegistry
+import round_state
+from round_state import RoundStateMachine, SnapshotFile
+import profiling
+from game_metrics import GameMetrics
+from game_clock import RealClock
+import game_clock
+startup_timing.mark("import models + storage")
+import tkinter as tk
+from virtual_list import VirtualList
+startup_timing.mark("import tkinter")
 
 '''
 NOTE: To run, please make sure you have tkinter installed, and make sure you have a modern version of Python 3.
 This game is compatible with Python 3.6 or newer on MacOS.
 Run with: python3 PromptingProject_BlackJack.py 
+Add --startup-report to print how long each startup phase took.
+Add --profile (or --profile-sample for flamegraph stacks) to time each round phase; see profiling.py.
+Add --speed 10 to run every screen delay 10x faster, or --speed 0 for no delays at all (turn timers stay real-time); see game_clock.py.
+Add --serve-leaderboard [PORT] to serve the rankings as JSON over HTTP; see leaderboard_server.py.
+Add --metrics-file FILE or --metrics-port PORT to export table metrics for Prometheus; see game_metrics.py.
+Add --record-session FILE to log this session's inputs for benchmark playback; see session_recorder.py.
+Add --shoe-file FILE to deal from pre-shuffled, audited shoes; see shoe_pool.py.
+Add --decision-log [DIR] to log every hit/stand/double/insurance choice for grading; see decision_grader.py.
+The game rules, models and leaderboard storage live in blackjack_models.py and leaderboard_store.py,
+which import without tkinter for headless use.
 '''
 
-# Card class
-class Card:
-    def __init__(self, suit, rank):
-        self.suit = suit
-        self.rank = rank
-        self.value = self.get_value()
-
-    def get_value(self):
-        if self.rank in ['J', 'Q', 'K']:
-            return 10
-        elif self.rank == 'A':
-            return 11
-        else:
-            return int(self.rank)
-
-    def __str__(self):
-        return f"{self.rank} of {self.suit}"
-
-# Deck class
-class Deck:
-    def __init__(self):
-        suits = ['Hearts', 'Diamonds', 'Clubs', 'Spades']
-        ranks = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
-        self.cards = [Card(suit, rank) for suit in suits for rank in ranks]
-        random.shuffle(self.cards)
-
-    def deal_card(self):
-        return self.cards.pop()
-
-# Player class
-class Player:
-    def __init__(self, name, chips=100, wins=0, badges=None, achievements=None):
-        self.name = name
-        self.hand = []
-        self.chips = chips
-        self.bet = 0
-        self.wins = wins
-        self.badges = badges if badges is not None else []
-        self.achievements = achievements if achievements is not None else []
-        self.doubled_down = False
-        self.insurance_bet = 0
-
-    def place_bet(self, amount):
-        if amount <= self.chips:
-            self.bet = amount
-            self.chips -= amount
-            return True
-        return False
-
-    def win_bet(self, is_blackjack=False):
-        if is_blackjack:
-            # Blackjack pays 3:2 (1.5x the bet)
-            self.chips += int(2.5 * self.bet)
-        else:
-            # Regular win pays 1:1 (2x the bet total)
-            self.chips += 2 * self.bet
-        self.bet = 0
-
-    def push_bet(self):
-        self.chips += self.bet
-        self.bet = 0
-
-    def double_down(self):
-        """Double the bet and mark player as doubled down"""
-        if self.chips >= self.bet:
-            self.chips -= self.bet
-            self.bet *= 2
-            self.doubled_down = True
-            return True
-        return False
-
-    def reset_hand(self):
-        self.hand = []
-        self.doubled_down = False
-
-# Dealer class
-class Dealer(Player):
-    def __init__(self):
-        super().__init__('Dealer')
-
-    def should_hit(self):
-        return self.get_hand_value() < 17
-
-    def get_hand_value(self):
-        value = sum(card.value for card in self.hand)
-        aces = sum(1 for card in self.hand if card.rank == 'A')
-        while value > 21 and aces:
-            value -= 10
-            aces -= 1
-        return value
+# Rows shown at once in each achievements leaderboard list; the rest are reached by scrolling
+LEADERBOARD_VISIBLE_ROWS = 8
+# Returning players' names offered under a name box while typing
+NAME_SUGGESTIONS = 4
 
 class BlackjackGame:
-    def __init__(self, root):
+    def __init__(self, root, clock=None):
         self.root = root
+        # Every screen delay goes through the clock so it can be sped up or virtualized
+        self.clock = clock or RealClock(root)
         self.root.title("🎀 BlackJack Palace 👑✨")
         self.root.configure(bg="#ffe6f0")
         self.root.geometry("1200x800")  # Set a default size
         self.leaderboard_file = "leaderboard.json"
-        self.player_stats = self.load_player_stats()
+        # Stats are read from disk the first time a screen needs them
+        self.leaderboard = LeaderboardStore(self.leaderboard_file)
+        # Saves are written by a background thread so settlement never waits on the disk
+        self.leaderboard.start_background_writer()
+        # New names the player already confirmed after a "did you mean" prompt
+        self.confirmed_new_names = set()
+        # The round's phase is tracked explicitly and snapshotted on every transition for crash recovery
+        self.snapshots = SnapshotFile(round_state.DEFAULT_SNAPSHOT_FILE).start()
+        self.round_state = RoundStateMachine(on_enter=self.on_round_phase)
+        # Throughput and table economics, exported only when asked for
+        self.metrics = GameMetrics()
+        # Optional DecisionLog: every decision with the cards behind it, for grading after the game
+        self.decisions = None
+        self.round_stats_dir = "round_stats"
+        self._round_stats = None
+        # Coaching overlay (hit/stand/double expected values), off until the player turns it on
+        self.coaching_var = tk.BooleanVar(master=self.root, value=False)
+        self._coach = None
+        # Optional ShoePool of pre-shuffled shoes; without one every round shuffles a fresh Deck
+        self.shoes = None
         self.reset_full_game()
+        # Theme packs load on first use; fonts are shared Font objects so Tk resolves each once
+        self.themes = ThemeRegistry(self.root)
         # Define fonts for the whole app
-        self.font_title = ("Arial Rounded MT Bold", 36, "bold")
-        self.font_subtitle = ("Arial Rounded MT Bold", 22, "bold")
-        self.font_label = ("Arial Rounded MT Bold", 16)
-        self.font_label_bold = ("Arial Rounded MT Bold", 16, "bold")
-        self.font_button = ("Arial Rounded MT Bold", 18, "bold")
-        self.font_small = ("Arial Rounded MT Bold", 13)
+        self.font_title = self.themes.font("Arial Rounded MT Bold", 36, "bold")
+        self.font_subtitle = self.themes.font("Arial Rounded MT Bold", 22, "bold")
+        self.font_label = self.themes.font("Arial Rounded MT Bold", 16)
+        self.font_label_bold = self.themes.font("Arial Rounded MT Bold", 16, "bold")
+        self.font_button = self.themes.font("Arial Rounded MT Bold", 18, "bold")
+        self.font_small = self.themes.font("Arial Rounded MT Bold", 13)
+        # Card faces
+        self.font_card_deco = self.themes.font("Comic Sans MS", 12)
+        self.font_card_corner = self.themes.font("Comic Sans MS", 13, "bold")
+        self.font_card_center = self.themes.font("Comic Sans MS", 28, "bold")
+        self.font_card_back = self.themes.font("Comic Sans MS", 40, "bold")
+        self.font_card_back_small = self.themes.font("Comic Sans MS", 20)
         self.setup_start_screen()
 
+    @property
+    def player_stats(self):
+        return self.leaderboard.stats
+
     def reset_full_game(self):
-        self.deck = Deck()
+        # play_round builds and shuffles a fresh deck, so there is nothing to deal from yet
+        self.deck = None
         self.players = []
         self.dealer = Dealer()
         self.current_player_idx = 0
         self.timer_id = None
         self.time_remaining = 15
 
+    def on_round_phase(self, phase):
+        if phase in round_state.RESUMABLE:
+            self.save_snapshot()
+        elif phase == round_state.SETTLED:
+            self.snapshots.clear()
+
+    def save_snapshot(self):
+        """Queue a snapshot of the round as it stands (after a transition or a player action)"""
+        self.snapshots.save(round_state.capture(self, self.round_state.phase))
+
+    def resume_round(self, state=None):
+        """Rebuild a round from a snapshot and carry on from the phase it was in"""
+        state = state or self.snapshots.load()
+        if state is None:
+            return
+
+        def make_player(name, is_ai, wins):
+            if not is_ai:
+                return self.get_or_create_player(name)
+            player = AIPlayer(self)
+            player.wins = wins
+            return player
+        self.players, self.deck, self.dealer = round_state.restore_models(state, make_player)
+        self.current_player_idx = state["player_idx"]
+        self.vs_ai_mode = state["vs_ai"]
+        phase = state["phase"]
+        self.round_state.restore(phase)
+        if phase in (round_state.SHUFFLE, round_state.BET):
+            self.bet_phase()
+        elif phase == round_state.INSURANCE:
+            self.offer_insurance(state["insurance_idx"])
+        elif phase == round_state.PLAYER_TURN:
+            player = self.players[self.current_player_idx]
+            # The snapshot can land between a bust or double down and the move to the next hand
+            if self.calculate_hand_value(player.hand) > 21 or player.doubled_down:
+                self.next_player()
+            else:
+                self.play_player_turn()
+        else:
+            self.dealer_turn()
+
     def style_button(self, button):
         button.configure(
             bg="#ffe066", fg="#9933cc",
@@ -157,6 +169,7 @@ class BlackjackGame:
         if not hasattr(self, 'card_theme'):
             self.card_theme = 'bow'  # Default to bow if not set
         self.reset_full_game()
+        self.round_state.enter(round_state.IDLE)
         content_frame = tk.Frame(main_frame, bg="#fff6fa")
         content_frame.pack(expand=True, padx=40, pady=40)
         self.title = tk.Label(content_frame, text="🏰 Welcome to BlackJack Palace! 👑💖", font=self.font_title, fg="#9933cc", bg="#fff6fa")
@@ -170,10 +183,14 @@ class BlackjackGame:
         self.player1_label.pack()
         self.player1_entry = tk.Entry(content_frame, font=self.font_label, fg="#9933cc", bg="white", width=18, justify="center", bd=2, relief="groove")
         self.player1_entry.pack(pady=4)
+        self.attach_name_autocomplete(self.player1_entry, content_frame)
         self.player2_label = tk.Label(content_frame, text="Player 2:", bg="#fff6fa", font=self.font_label, fg="#9933cc")
         self.player2_label.pack()
         self.player2_entry = tk.Entry(content_frame, font=self.font_label, fg="#9933cc", bg="white", width=18, justify="center", bd=2, relief="groove")
         self.player2_entry.pack(pady=4)
+        self.attach_name_autocomplete(self.player2_entry, content_frame)
+        self.coaching_check = tk.Checkbutton(content_frame, text="🎓 Coaching Mode", variable=self.coaching_var, bg="#fff6fa", fg="#9933cc", activebackground="#fff6fa", font=self.font_label)
+        self.coaching_check.pack(pady=(12, 0))
         self.start_button = tk.Button(content_frame, text="Start Game", command=self.start_game)
         self.style_button(self.start_button)
         self.start_button.pack(pady=24)
@@ -183,27 +200,66 @@ class BlackjackGame:
         self.achievements_button = tk.Button(content_frame, text="Achievements + Leaderboard", command=self.show_achievements_leaderboard)
         self.style_button(self.achievements_button)
         self.achievements_button.pack(pady=8)
+        if self.snapshots.load():
+            self.resume_button = tk.Button(content_frame, text="Resume Interrupted Round", command=self.resume_round)
+            self.style_button(self.resume_button)
+            self.resume_button.pack(pady=8)
         self.exit_button = tk.Button(content_frame, text="Exit", command=self.root.quit)
         self.style_button(self.exit_button)
         self.exit_button.pack(pady=8)
 
+    def attach_name_autocomplete(self, entry, parent):
+        """Offer returning players' names under a name box as it is typed; Tab takes the first"""
+        suggestions_frame = tk.Frame(parent, bg="#fff6fa")
+        suggestions_frame.pack()
+        entry.bind("<KeyRelease>", lambda event: self.show_name_suggestions(entry, suggestions_frame))
+        entry.bind("<Tab>", lambda event: self.complete_name(entry, suggestions_frame))
+
+    def show_name_suggestions(self, entry, suggestions_frame):
+        for widget in suggestions_frame.winfo_children():
+            widget.destroy()
+        typed = entry.get().strip()
+        if not typed:
+            return
+        # Only prefix completion runs per keystroke; the fuzzy "did you mean" check waits for Start (confirm_new_names)
+        matches = [name for name in self.leaderboard.names.complete(typed, NAME_SUGGESTIONS + 1) if name != typed][:NAME_SUGGESTIONS]
+        for name in matches:
+            button = tk.Button(suggestions_frame, text=name, command=lambda n=name: self.pick_name(entry, suggestions_frame, n),
+                               bg="#fff6fa", fg="#9933cc", activebackground="#ffe6f0", font=self.font_small, relief="flat", cursor="hand2")
+            button.pack(side=tk.LEFT, padx=2)
+
+    def pick_name(self, entry, suggestions_frame, name):
+        entry.delete(0, tk.END)
+        entry.insert(0, name)
+        entry.icursor(tk.END)
+        self.show_name_suggestions(entry, suggestions_frame)
+
+    def complete_name(self, entry, suggestions_frame):
+        typed = entry.get().strip()
+        matches = self.leaderboard.names.complete(typed, 1) if typed else []
+        if not matches or matches[0] == typed:
+            return None  # Let Tab move focus as usual
+        self.pick_name(entry, suggestions_frame, matches[0])
+        return "break"
+
+    def confirm_new_names(self, names):
+        """Stop once on a new name that looks like a mistyped returning player, before a duplicate record is made"""
+        for name in names:
+            if name in self.player_stats or name in self.confirmed_new_names:
+                continue
+            self.confirmed_new_names.add(name)
+            suggestions = self.leaderboard.names.suggest(name)
+            if suggestions:
+                self.show_custom_message("Did you mean...?", f"There's no player called {name} yet. Did you mean {' or '.join(suggestions)}?\nPress Start again to play as a new player.")
+                return False
+        return True
+
     def show_customize_page(self):
         main_frame = self._get_centered_frame()
         content_frame = tk.Frame(main_frame, bg="#fff6fa")
         content_frame.pack(expand=True, padx=40, pady=40)
         
-        suite_names = {
-            'bow': '🎀 The Bow Suite 🎀', 
-            'sakura': '🌸 The Sakura Suite 🌸', 
-            'ballet': '🩰 The Ballerina Suite 🩰',
-            'starlight': '✨ The Starlight Suite ✨',
-            'mermaid': '🧜‍♀️ The Mermaid Suite 🧜‍♀️',
-            'fairy': '🧚 The Fairy Suite 🧚',
-            'princess': '👸 The Princess Suite 👸',
-            'castle': '🏰 The Castle Suite 🏰',
-            'dragon': '🐲 The Dragon Suite 🐲'
-        }
-        self.suite_label = tk.Label(content_frame, text=f"Current Suite: {suite_names.get(self.card_theme, '🎀 The Bow Suite 🎀')}", font=self.font_subtitle, fg="#9933cc", bg="#fff6fa")
+        self.suite_label = tk.Label(content_frame, text=self.themes.get(self.card_theme).suite_label, font=self.font_subtitle, fg="#9933cc", bg="#fff6fa")
         self.suite_label.pack(pady=(20, 10))
         label = tk.Label(content_frame, text="Choose Your Card Theme!", font=self.font_title, fg="#9933cc", bg="#fff6fa")
         label.pack(pady=20)
@@ -213,11 +269,7 @@ class BlackjackGame:
         buttons_frame.pack(pady=10)
 
         # Create buttons
-        theme_buttons_data = [
-            ('bow', suite_names['bow']), ('sakura', suite_names['sakura']), ('ballet', suite_names['ballet']),
-            ('starlight', suite_names['starlight']), ('mermaid', suite_names['mermaid']), ('fairy', suite_names['fairy']),
-            ('princess', suite_names['princess']), ('castle', suite_names['castle']), ('dragon', suite_names['dragon'])
-        ]
+        theme_buttons_data = [(theme.id, theme.name) for theme in self.themes.themes.values()]
         
         # Place buttons in a 3-column grid
         for i, (theme, text) in enumerate(theme_buttons_data):
@@ -234,68 +286,39 @@ class BlackjackGame:
         self.card_theme = theme
         if update_only:
             # Just update the suite label
-            suite_names = {
-                'bow': '🎀 The Bow Suite 🎀', 
-                'sakura': '🌸 The Sakura Suite 🌸', 
-                'ballet': '🩰 The Ballerina Suite 🩰',
-                'starlight': '✨ The Starlight Suite ✨',
-                'mermaid': '🧜‍♀️ The Mermaid Suite 🧜‍♀️',
-                'fairy': '🧚 The Fairy Suite 🧚',
-                'princess': '👸 The Princess Suite 👸',
-                'castle': '🏰 The Castle Suite 🏰',
-                'dragon': '🐲 The Dragon Suite 🐲'
-            }
             if hasattr(self, 'suite_label'):
-                self.suite_label.config(text=f"Current Suite: {suite_names.get(self.card_theme, '🎀 The Bow Suite 🎀')}")
+                self.suite_label.config(text=self.themes.get(self.card_theme).suite_label)
         else:
             self.setup_start_screen()
 
     def get_theme_emoji(self):
-        theme = getattr(self, 'card_theme', 'bow')
-        if theme == 'sakura':
-            return "🌸"
-        elif theme == 'ballet':
-            return "🩰"
-        elif theme == 'starlight':
-            return "✨"
-        elif theme == 'mermaid':
-            return "🧜‍♀️"
-        elif theme == 'fairy':
-            return "🧚"
-        elif theme == 'princess':
-            return "👸"
-        elif theme == 'castle':
-            return "🏰"
-        elif theme == 'dragon':
-            return "🐲"
-        return "🎀"
+        return self.themes.get(getattr(self, 'card_theme', 'bow')).emoji
 
     def draw_card_box(self, canvas, card, x, y):
         # Card rectangle
         canvas.create_rectangle(x-40, y-60, x+40, y+60, fill="white", outline="purple", width=3)
         # Theme emoji
         deco = self.get_theme_emoji()
+        _, corner_text, center_text = self.themes.card_glyphs(card)
         # Top-left corner
-        canvas.create_text(x-32, y-52, text=deco, font=("Comic Sans MS", 12), fill="purple", anchor="nw")
-        canvas.create_text(x-25, y-45, text=f"{card.rank}{self.get_card_emoji(card)}", font=("Comic Sans MS", 13, "bold"), fill="purple", anchor="nw")
+        canvas.create_text(x-32, y-52, text=deco, font=self.font_card_deco, fill="purple", anchor="nw")
+        canvas.create_text(x-25, y-45, text=corner_text, font=self.font_card_corner, fill="purple", anchor="nw")
         # Bottom-right corner
-        canvas.create_text(x+32, y+52, text=deco, font=("Comic Sans MS", 12), fill="purple", anchor="se")
-        canvas.create_text(x+25, y+45, text=f"{card.rank}{self.get_card_emoji(card)}", font=("Comic Sans MS", 13, "bold"), fill="purple", anchor="se")
+        canvas.create_text(x+32, y+52, text=deco, font=self.font_card_deco, fill="purple", anchor="se")
+        canvas.create_text(x+25, y+45, text=corner_text, font=self.font_card_corner, fill="purple", anchor="se")
         # Center: for face cards, show emoji; for number cards, show suit
-        if card.rank in ['J', 'Q', 'K', 'A']:
-            center_text = self.get_card_emoji(card)
-        else:
-            center_text = self.get_card_emoji(card)[-1]  # just the suit emoji
-        canvas.create_text(x, y, text=center_text, font=("Comic Sans MS", 28, "bold"), fill="purple")
+        canvas.create_text(x, y, text=center_text, font=self.font_card_center, fill="purple")
 
     def start_game(self):
         name1 = self.player1_entry.get().strip()
         name2 = self.player2_entry.get().strip()
-        # Use persistent player objects
-        self.players = [self.get_or_create_player(name1), self.get_or_create_player(name2)] if name1 and name2 else []
-        if not self.players or len(self.players) != 2:
+        if not name1 or not name2:
             self.show_custom_message("Error", "Please enter both player names.")
             return
+        if not self.confirm_new_names([name1, name2]):
+            return
+        # Use persistent player objects
+        self.players = [self.get_or_create_player(name1), self.get_or_create_player(name2)]
         self.play_round()
 
     def start_game_vs_ai(self):
@@ -303,16 +326,24 @@ class BlackjackGame:
         if not name1:
             self.show_custom_message("Error", "Please enter your name for Player 1.")
             return
-        self.players = [self.get_or_create_player(name1), self.AIPlayer(self)]
+        if not self.confirm_new_names([name1]):
+            return
+        self.players = [self.get_or_create_player(name1), AIPlayer(self)]
         self.vs_ai_mode = True
         self.play_round()
 
     def play_round(self):
         self.clear_screen()
-        self.deck = Deck()
+        self.deck = self.shoes.next_deck() if self.shoes else None
+        if self.deck is None:
+            self.deck = Deck()
+        if self._coach:
+            self._coach.new_shoe()
         self.dealer.reset_hand()
         for player in self.players:
             player.reset_hand()
+        self.round_state.enter(round_state.SHUFFLE)
+        self.metrics.round_started()
         self.animate_shuffle()
 
     def animate_shuffle(self):
@@ -370,11 +401,12 @@ class BlackjackGame:
             # Swap in the list to keep track
             cards[idx1], cards[idx2] = cards[idx2], cards[idx1]
 
-            self.root.after(400, do_animation_step, step_index + 1)
+            self.clock.after(400, do_animation_step, step_index + 1)
 
-        self.root.after(500, do_animation_step)
+        self.clock.after(500, do_animation_step)
 
     def bet_phase(self):
+        self.round_state.enter(round_state.BET)
         card_frame = self._get_centered_frame()
         content_frame = tk.Frame(card_frame, bg="#fff6fa")
         content_frame.pack(expand=True, padx=40, pady=40)
@@ -419,9 +451,10 @@ class BlackjackGame:
         self.dealer.hand.append(self.deck.deal_card())
         self.current_player_idx = 0
         
-        # Check for dealer Ace (offer insurance)
+        # Check for dealer Ace (offer insurance); the insurance screen checks naturals once everyone has decided
         if self.dealer.hand[0].rank == 'A':
             self.offer_insurance()
+            return
         
         # Check for natural blackjacks before player turns
         if self.check_natural_blackjacks():
@@ -429,7 +462,7 @@ class BlackjackGame:
         
         self.play_player_turn()
 
-    def offer_insurance(self):
+    def offer_insurance(self, start_idx=0):
         """Offer insurance when dealer shows an Ace"""
         main_frame = self._get_centered_frame()
         content_frame = tk.Frame(main_frame, bg="#ffe6f0")
@@ -449,13 +482,14 @@ class BlackjackGame:
         canvas.pack(pady=10)
         self.draw_card_box(canvas, self.dealer.hand[0], 150, 75)
         
-        self.insurance_player_idx = 0
+        self.insurance_player_idx = start_idx
         self.insurance_ui_frame = tk.Frame(content_frame, bg="#ffe6f0")
         self.insurance_ui_frame.pack(pady=10)
         self.process_insurance_for_player()
 
     def process_insurance_for_player(self):
         """Process insurance decision for current player"""
+        self.round_state.enter(round_state.INSURANCE)
         # Clear previous player's insurance UI
         for widget in self.insurance_ui_frame.winfo_children():
             widget.destroy()
@@ -501,14 +535,19 @@ class BlackjackGame:
 
     def take_insurance(self, player, cost):
         """Player takes insurance"""
+        if self.decisions:
+            self.decisions.record(player, "insurance", self.deck.cards, self.dealer.hand, stake=cost)
         player.chips -= cost
         player.insurance_bet = cost
+        self.metrics.insurance(cost)
         self.insurance_player_idx += 1
         self.process_insurance_for_player()
 
     def decline_insurance(self):
         """Player declines insurance"""
         player = self.players[self.insurance_player_idx]
+        if self.decisions:
+            self.decisions.record(player, "no_insurance", self.deck.cards, self.dealer.hand)
         player.insurance_bet = 0
         self.insurance_player_idx += 1
         self.process_insurance_for_player()
@@ -562,55 +601,73 @@ class BlackjackGame:
                 self.draw_card_box(canvas, card, x, y_pos)
         
         result_text = f"Dealer Value: {self.dealer.get_hand_value()}\n"
+        round_id = self.round_stats.begin_round()
+        outcome_counts = dict.fromkeys(OUTCOME_NAMES, 0)
+        house_net = 0
+        for player in player_blackjacks:
+            self.metrics.natural("player")
+        if dealer_blackjack:
+            self.metrics.natural("dealer")
         
+        # Drop the snapshot before any result is applied or saved, so a crash can't settle this round twice
+        self.round_state.enter(round_state.SETTLED)
         # Process results
         for player in self.players:
             player_value = self.calculate_hand_value(player.hand)
             player_has_blackjack = player in player_blackjacks
+            bet, chips_before = player.bet, player.chips
+            outcome = OUTCOME_LOSS
             
             if dealer_blackjack and player_has_blackjack:
                 # Both have blackjack - push
                 player.push_bet()
+                outcome = OUTCOME_PUSH
                 result_text += f"{player.name}: Blackjack vs Blackjack - Push!\n"
             elif player_has_blackjack and not dealer_blackjack:
                 # Player blackjack wins
                 player.win_bet(is_blackjack=True)
                 player.wins += 1
+                outcome = OUTCOME_BLACKJACK
                 result_text += f"{player.name}: Natural Blackjack! Pays 3:2! 🎉\n"
             elif dealer_blackjack and not player_has_blackjack:
                 # Dealer blackjack, player loses
+                player.bet = 0
                 result_text += f"{player.name}: Dealer Blackjack - You lose.\n"
             
-            self.update_player_stats(player)
+            # Insurance is settled here too: it pays 2:1 plus the stake back on a dealer blackjack
+            insurance = player.insurance_bet
+            if insurance > 0:
+                insurance_payout = 3 * insurance if dealer_blackjack else 0
+                player.chips += insurance_payout
+                if insurance_payout:
+                    result_text += f"{player.name}: Insurance pays! +{insurance_payout - insurance} chips\n"
+                    self.metrics.insurance(insurance, paid=insurance_payout)
+                else:
+                    result_text += f"{player.name}: Insurance loses.\n"
+                player.insurance_bet = 0
+            
+            self.record_round_result(round_id, player, outcome, bet, insurance, chips_before, natural_round=True)
+            self.update_player_stats(player, save=False)
+            outcome_counts[OUTCOME_NAMES[outcome]] += 1
+            # The insurance stake left the chips when it was placed, so it is added back as staked
+            house_net += bet + insurance - (player.chips - chips_before)
+        self.metrics.round_finished(outcome_counts, house_net)
+        self.save_player_stats()
+        self.round_stats.flush()
         
         # Show results
         result_label = tk.Label(content_frame, text=result_text, bg="#ffe6f0", font=("Comic Sans MS", 12), fg="#9933cc")
         result_label.pack(pady=10)
         
         # Continue to next round or end game
-        self.root.after(4000, self.check_game_over)
+        self.clock.after(4000, self.check_game_over)
         return True
 
     def get_card_emoji(self, card):
-        suit_emojis = {
-            'Hearts': '❤️',
-            'Diamonds': '💎',
-            'Clubs': '♣️',
-            'Spades': '♠️'
-        }
-        rank_emojis = {
-            'J': '🧑',
-            'Q': '👸',
-            'K': '🤴',
-            'A': '🅰️'
-        }
-        bottom = ''
-        if card.rank in rank_emojis:
-            bottom += rank_emojis[card.rank]
-        bottom += suit_emojis.get(card.suit, '')
-        return bottom
+        return self.themes.card_glyphs(card)[0]
 
     def play_player_turn(self):
+        self.round_state.enter(round_state.PLAYER_TURN)
         main_frame = self._get_centered_frame()
         content_frame = tk.Frame(main_frame, bg="#ffe6f0")
         content_frame.pack(expand=True)
@@ -647,9 +704,13 @@ class BlackjackGame:
 
         self.value_label = tk.Label(hand_frame, text=f"Hand Value: {self.calculate_hand_value(player.hand)}", bg="#ffe6f0", font=self.font_label_bold, fg="#9933cc")
         self.value_label.pack(pady=5)
+        if self.coaching_var.get() and not (hasattr(player, 'is_ai') and player.is_ai) and self.calculate_hand_value(player.hand) <= 21:
+            self.coach_label = tk.Label(hand_frame, text="🎓 Coach is thinking...", bg="#ffe6f0", font=self.font_small, fg="#e75480")
+            self.coach_label.pack(pady=2)
+            self.update_coach(player)
         if hasattr(player, 'is_ai') and player.is_ai:
             # AI turn: auto hit/stand after a delay
-            self.timer_id = self.root.after(3000, self.ai_play_turn)
+            self.timer_id = self.clock.after(3000, self.ai_play_turn)
             return
         
         # Create button frame for better layout
@@ -673,17 +734,45 @@ class BlackjackGame:
         self.time_remaining = 15
         self.timer_label = tk.Label(content_frame, text=f"Time Remaining: {self.time_remaining} seconds ⏳", bg="#ffe6f0", font=self.font_small, fg="red")
         self.timer_label.pack(pady=5)
+        self.metrics.decision_started()
         self.start_timer()
 
+    @property
+    def coach(self):
+        if self._coach is None:
+            from coach import Coach
+            self._coach = Coach()
+        return self._coach
+
+    def update_coach(self, player):
+        """Fill the coaching overlay for the current hand, solving in the background if needed"""
+        from coach import format_advice
+        position = self.coach.position(self.deck.cards, self.dealer.hand[1], self.dealer.hand[0], player.hand)
+        label = self.coach_label
+        advice = self.coach.lookup(position)
+        if advice is not None:
+            label.config(text=format_advice(advice))
+            return
+        future = self.coach.advise(position)
+
+        def show_when_ready():
+            if not label.winfo_exists():
+                return  # The hand moved on before the answer arrived
+            if future.done():
+                label.config(text=format_advice(future.result()))
+            else:
+                self.root.after(5, show_when_ready)
+        self.root.after(5, show_when_ready)
+
     def draw_hole_card(self, canvas, x, y, return_id=False):
         """Draw a face-down card (hole card)"""
         # Card rectangle
         rect_id = canvas.create_rectangle(x-40, y-60, x+40, y+60, fill="#9933cc", outline="purple", width=3)
         # Card back pattern with theme emoji
         deco = self.get_theme_emoji()
-        text1_id = canvas.create_text(x, y, text=deco, font=("Comic Sans MS", 40, "bold"), fill="white")
-        text2_id = canvas.create_text(x, y-20, text=deco, font=("Comic Sans MS", 20), fill="white")
-        text3_id = canvas.create_text(x, y+20, text=deco, font=("Comic Sans MS", 20), fill="white")
+        text1_id = canvas.create_text(x, y, text=deco, font=self.font_card_back, fill="white")
+        text2_id = canvas.create_text(x, y-20, text=deco, font=self.font_card_back_small, fill="white")
+        text3_id = canvas.create_text(x, y+20, text=deco, font=self.font_card_back_small, fill="white")
         if return_id:
             return (rect_id, text1_id, text2_id, text3_id)
 
@@ -691,7 +780,9 @@ class BlackjackGame:
         player = self.players[self.current_player_idx]
         dealer_upcard = self.dealer.hand[0]
         if player.decide_hit(player.hand, dealer_upcard):
+            self.record_decision(player, "hit")
             player.hand.append(self.deck.deal_card())
+            self.save_snapshot()
             # Redraw to show the new card
             self.play_player_turn()
             # After redraw, check for bust
@@ -699,7 +790,7 @@ class BlackjackGame:
                 # Cancel the next AI move that was scheduled by play_player_turn
                 self.cancel_timer()
                 # Show the bust message, which will auto-close
-                self.root.after(1000, lambda: self.show_custom_message(
+                self.clock.after(1000, lambda: self.show_custom_message(
                     "Bust!", f"{player.name} busted!", 
                     on_close=self.next_player, 
                     auto_close_delay=2000
@@ -711,45 +802,70 @@ class BlackjackGame:
         self.timer_label.config(text=f"Time Remaining: {self.time_remaining} seconds ⏳")
         if self.time_remaining <= 0:
             self.cancel_timer()  # Stop the timer before showing the message
-            self.show_custom_message("Timeout!", "Time's up! Auto-stand applied.", on_close=self.stand)
+            self.metrics.auto_stand()
+            self.show_custom_message("Timeout!", "Time's up! Auto-stand applied.", on_close=self.auto_stand)
             return
         self.time_remaining -= 1
-        self.timer_id = self.root.after(1000, self.start_timer)
+        # The decision window stays in real seconds even when the table is sped up
+        self.timer_id = self.clock.after_real(1000, self.start_timer)
 
     def cancel_timer(self):
         if self.timer_id:
-            self.root.after_cancel(self.timer_id)
+            self.clock.after_cancel(self.timer_id)
             self.timer_id = None
 
+    def record_decision(self, player, action):
+        # Hands already doubled only get their one card; any click after that isn't a real choice
+        if self.decisions and not getattr(player, 'doubled_down', False):
+            can_double = len(player.hand) == 2 and player.chips >= player.bet and not getattr(player, 'is_ai', False)
+            self.decisions.record(player, action, self.deck.cards, self.dealer.hand, can_double=can_double)
+
     def hit(self):
         self.cancel_timer()
+        self.metrics.decision_made()
         player = self.players[self.current_player_idx]
+        self.record_decision(player, "hit")
         player.hand.append(self.deck.deal_card())
+        self.save_snapshot()
         self.play_player_turn()  # Always update UI to show the new card
         if self.calculate_hand_value(player.hand) > 21:
             # Show bust message after a short delay so the card is visible
-            self.root.after(1000, lambda: self.show_custom_message("Bust!", f"{player.name} busted!", on_close=self.next_player))
+            self.clock.after(1000, lambda: self.show_custom_message("Bust!", f"{player.name} busted!", on_close=self.next_player))
 
     def double_down(self):
-        self.cancel_timer()
         player = self.players[self.current_player_idx]
-        if player.double_down():
-            # Double down: double bet, get exactly one card, then stand
-            player.hand.append(self.deck.deal_card())
-            self.play_player_turn()  # Update UI to show the new card
-            if self.calculate_hand_value(player.hand) > 21:
-                # Show bust message after delay
-                self.root.after(1000, lambda: self.show_custom_message("Bust!", f"{player.name} doubled down and busted!", on_close=self.next_player))
-            else:
-                # Automatically stand after double down
-                self.root.after(1000, self.next_player)
-        else:
+        if player.chips < player.bet:
+            # Refused: nothing was decided, so the turn (and its timer) carries on
             self.show_custom_message("Error", "Insufficient chips to double down!")
+            return
+        self.cancel_timer()
+        self.metrics.decision_made()
+        # Logged before double_down() changes the bet, so the grade is against the hand as offered
+        self.record_decision(player, "double")
+        player.double_down()
+        self.metrics.double_down()
+        # Double down: double bet, get exactly one card, then stand
+        player.hand.append(self.deck.deal_card())
+        self.save_snapshot()
+        self.play_player_turn()  # Update UI to show the new card
+        if self.calculate_hand_value(player.hand) > 21:
+            # Show bust message after delay
+            self.clock.after(1000, lambda: self.show_custom_message("Bust!", f"{player.name} doubled down and busted!", on_close=self.next_player))
+        else:
+            # Automatically stand after double down
+            self.clock.after(1000, self.next_player)
 
-    def stand(self):
+    def stand(self, action="stand"):
         self.cancel_timer()
+        self.metrics.decision_made()
+        self.record_decision(self.players[self.current_player_idx], action)
         self.next_player()
 
+    def auto_stand(self):
+        """The turn timer ran out; stand without counting it as the player's choice"""
+        from decision_grader import TIMEOUT
+        self.stand(action=TIMEOUT)
+
     def next_player(self):
         self.current_player_idx += 1
         if self.current_player_idx >= len(self.players):
@@ -758,6 +874,7 @@ class BlackjackGame:
             self.play_player_turn()
 
     def dealer_turn(self):
+        self.round_state.enter(round_state.DEALER_TURN)
         while self.dealer.should_hit():
             self.dealer.hand.append(self.deck.deal_card())
         dealer_value = self.dealer.get_hand_value()
@@ -779,72 +896,76 @@ class BlackjackGame:
         # Check if dealer has blackjack for insurance payouts
         dealer_has_blackjack = len(self.dealer.hand) == 2 and dealer_value == 21
         
-        for player in self.players:
-            player_value = self.calculate_hand_value(player.hand)
-            win = False
-            blackjack = False
-            round_21 = False
-            all_face = False
-            all_red = False
-            comeback = False
-            streak = getattr(player, 'win_streak', 0)
+        round_id = self.round_stats.begin_round()
+        
+        # Settle every seat in one vectorized pass, then apply the results
+        from settlement import settle
+        player_values = [self.calculate_hand_value(player.hand) for player in self.players]
+        bets = [player.bet for player in self.players]
+        # This round's insurance stakes, taken once here and cleared on every seat as it settles
+        insurance = [player.insurance_bet for player in self.players]
+        settled = settle(
+            bets, player_values, dealer_value,
+            blackjacks=[len(player.hand) == 2 and value == 21 for player, value in zip(self.players, player_values)],
+            insurance=insurance,
+            dealer_blackjack=dealer_has_blackjack,
+            doubled=[player.doubled_down for player in self.players],
+            win_streaks=[getattr(player, 'win_streak', 0) for player in self.players],
+            wins=[player.wins for player in self.players])
+        # Drop the snapshot before any result is applied or saved, so a crash can't settle this round twice
+        self.round_state.enter(round_state.SETTLED)
+        
+        for i, player in enumerate(self.players):
+            player_value = player_values[i]
+            outcome = int(settled["outcome"][i])
+            chips_before = player.chips
             
-            # Handle insurance payouts first
-            if hasattr(player, 'insurance_bet') and player.insurance_bet > 0:
+            # Insurance results first
+            if insurance[i] > 0:
                 if dealer_has_blackjack:
-                    # Insurance pays 2:1
-                    insurance_payout = player.insurance_bet * 3  # 2:1 plus original bet back
-                    player.chips += insurance_payout
-                    result_text += f"{player.name}: Insurance pays! +{insurance_payout - player.insurance_bet} chips\n"
+                    result_text += f"{player.name}: Insurance pays! +{settled['insurance_payout'][i] - insurance[i]} chips\n"
+                    self.metrics.insurance(insurance[i], paid=int(settled["insurance_payout"][i]))
                 else:
                     result_text += f"{player.name}: Insurance loses.\n"
-                player.insurance_bet = 0  # Reset insurance bet
-            
-            # Check for blackjack (21 with exactly 2 cards)
-            is_player_blackjack = len(player.hand) == 2 and player_value == 21
+            player.insurance_bet = 0
+            player.chips += int(settled["payout"][i] + settled["insurance_payout"][i])
+            player.bet = 0
+            player.wins = int(settled["wins"][i])
+            player.win_streak = int(settled["win_streak"][i])
             
-            # Check win conditions
-            if player_value > 21:
+            if outcome == OUTCOME_BUST:
                 result_text += f"{player.name} busted. Lost bet.\n"
-                player.win_streak = 0
-            elif dealer_value > 21 or player_value > dealer_value:
-                # Player wins
-                player.win_bet(is_blackjack=is_player_blackjack)
-                player.wins += 1
-                win = True
-                # Streak logic
-                player.win_streak = getattr(player, 'win_streak', 0) + 1
-                
-                # Set flags for achievements
-                if is_player_blackjack:
-                    blackjack = True
+            elif outcome in (OUTCOME_WIN, OUTCOME_BLACKJACK):
+                blackjack = outcome == OUTCOME_BLACKJACK
+                if blackjack:
                     result_text += f"{player.name} wins with Blackjack! Pays 3:2! 🎉\n"
                 else:
                     result_text += f"{player.name} wins! 🎉\n"
                 
                 # 21 exactly
-                if player_value == 21:
-                    round_21 = True
+                round_21 = player_value == 21
                 # All face cards
                 all_face = all(card.rank in ['J', 'Q', 'K'] for card in player.hand)
                 # All red
                 all_red = all(card.suit in ['Hearts', 'Diamonds'] for card in player.hand)
                 # Comeback: won and chips were less than dealer before round
-                if hasattr(self, 'dealer') and player.chips < self.dealer.chips:
-                    comeback = True
-                # Check and award badges
-                new_badges, new_achievements = self.check_and_award_badges(
-                    player, player.hand, win, blackjack, round_21, all_face, all_red, comeback, player.win_streak)
+                comeback = hasattr(self, 'dealer') and player.chips < self.dealer.chips
+                # Check and award badges; the leaderboard server reads these same lists and dicts under this lock
+                with self.leaderboard.lock:
+                    new_badges, new_achievements = self.check_and_award_badges(
+                        player, player.hand, True, blackjack, round_21, all_face, all_red, comeback, player.win_streak)
                 if new_badges or new_achievements:
                     self.badge_achievements_this_round.append((player.name, new_badges, new_achievements))
-            elif player_value == dealer_value:
-                player.push_bet()
+            elif outcome == OUTCOME_PUSH:
                 result_text += f"{player.name} pushes. Bet returned.\n"
-                player.win_streak = 0
             else:
                 result_text += f"{player.name} loses.\n"
-                player.win_streak = 0
-            self.update_player_stats(player)
+            self.record_round_result(round_id, player, outcome, bets[i], insurance[i], chips_before)
+            self.update_player_stats(player, save=False)
+        self.metrics.round_finished(settled["outcome_counts"], settled["house_net"])
+        # Commit the whole round to disk once
+        self.save_player_stats()
+        self.round_stats.flush()
         self.last_round_results = result_text
         self.dealer_final_hand = list(self.dealer.hand)  # Save dealer's hand for next page
         self.result_label = tk.Label(content_frame, text=result_text, bg="#ffe6f0", font=("Comic Sans MS", 12), fg="#9933cc")
@@ -959,7 +1080,7 @@ class BlackjackGame:
             for name, badges, achievements in self.badge_achievements_this_round:
                 if badges or achievements:
                     badge_str = ' '.join(badges)
-                    ach_str = '\n'.join(achievements)
+                    ach_str = '\n'.join(render_achievement(name, ach) for ach in achievements)
                     notif = tk.Label(content_frame, text=f"{name} earned: {badge_str}\n{ach_str}", bg="#fff6fa", fg="#e75480", font=self.font_label_bold, justify="center")
                     notif.pack(pady=4)
         
@@ -982,42 +1103,44 @@ class BlackjackGame:
         self.play_round()
 
     def calculate_hand_value(self, hand):
-        value = sum(card.value for card in hand)
-        aces = sum(1 for card in hand if card.rank == 'A')
-        while value > 21 and aces:
-            value -= 10
-            aces -= 1
-        return value
+        return calculate_hand_value(hand)
+
+    @property
+    def round_stats(self):
+        # Opened on the first settled round so numpy stays off the startup path
+        if self._round_stats is None:
+            from round_stats import RoundStatsStore
+            self._round_stats = RoundStatsStore(self.round_stats_dir).start()
+        return self._round_stats
+
+    def record_round_result(self, round_id, player, outcome, bet, insurance, chips_before, natural_round=False):
+        """Append one settled seat to the columnar round history"""
+        self.round_stats.record(
+            round_id, player.name,
+            dealer_upcard=self.dealer.hand[0].value,
+            player_total=self.calculate_hand_value(player.hand),
+            dealer_total=self.dealer.get_hand_value(),
+            num_cards=len(player.hand),
+            outcome=outcome,
+            doubled=player.doubled_down,
+            natural_round=natural_round,
+            bet=bet,
+            insurance=insurance,
+            payout=player.chips - chips_before,
+            chips_after=player.chips)
 
     def load_player_stats(self):
-        try:
-            with open(self.leaderboard_file, "r") as f:
-                data = json.load(f)
-            # Migrate old format if needed
-            for k, v in list(data.items()):
-                if isinstance(v, int):
-                    data[k] = {"wins": max(0, v), "badges": [], "achievements": []}
-            return data
-        except Exception:
-            return {}
+        return self.leaderboard.load_player_stats()
 
     def save_player_stats(self):
-        with open(self.leaderboard_file, "w") as f:
-            json.dump(self.player_stats, f, indent=2)
+        self.leaderboard.save_player_stats()
 
     def get_or_create_player(self, name):
-        if name not in self.player_stats:
-            self.player_stats[name] = {"wins": 0, "badges": [], "achievements": []}
-        stats = self.player_stats[name]
+        stats = self.leaderboard.get_record(name)
         return Player(name, wins=stats["wins"], badges=stats["badges"], achievements=stats["achievements"])
 
-    def update_player_stats(self, player):
-        self.player_stats[player.name] = {
-            "wins": player.wins,
-            "badges": player.badges,
-            "achievements": player.achievements
-        }
-        self.save_player_stats()
+    def update_player_stats(self, player, save=True):
+        self.leaderboard.update_player(player.name, player.wins, player.badges, player.achievements, save=save)
 
     # Badge rules
     def check_and_award_badges(self, player, hand, win, blackjack, round_21, all_face, all_red, comeback, streak):
@@ -1030,58 +1153,57 @@ class BlackjackGame:
         if round_21 and "🍧" not in player.badges:
             player.badges.append("🍧")
             new_badges.append("🍧")
-            new_achievements.append(f"{player.name} earned the Ice Cream🍧 for getting 21 exactly!")
+            new_achievements.append("ice_cream")
         # 🪷 Pink Lotus: Reach 5 wins
         if player.wins >= 5 and "🪷" not in player.badges:
             player.badges.append("🪷")
             new_badges.append("🪷")
-            new_achievements.append(f"{player.name} earned the Pink Lotus🪷 for getting five wins!")
+            new_achievements.append("pink_lotus")
         # 🦩 Flamingo: Win 3 rounds in a row
         if streak >= 3 and "🦩" not in player.badges:
             player.badges.append("🦩")
             new_badges.append("🦩")
-            new_achievements.append(f"{player.name} earned the Flamingo🦩 for winning 3 rounds in a row!")
+            new_achievements.append("flamingo")
         # 🩰 Ballet Slipper: Win with only face cards
         if all_face and "🩰" not in player.badges:
             player.badges.append("🩰")
             new_badges.append("🩰")
-            new_achievements.append(f"{player.name} earned the Ballet Slipper🩰 for winning with only face cards!")
+            new_achievements.append("ballet_slipper")
         # 🌸 Cherry Blossom: Win with all hearts or diamonds
         if all_red and "🌸" not in player.badges:
             player.badges.append("🌸")
             new_badges.append("🌸")
-            new_achievements.append(f"{player.name} earned the Cherry Blossom🌸 for winning with all hearts or diamonds!")
+            new_achievements.append("cherry_blossom")
         # 💖 Heart Gem: Win with blackjack
         if blackjack and "💖" not in player.badges:
             player.badges.append("💖")
             new_badges.append("💖")
-            new_achievements.append(f"{player.name} earned the Heart Gem💖 for winning with a blackjack!")
+            new_achievements.append("heart_gem")
         # 🦄 Unicorn: Win after being behind in chips
         if comeback and "🦄" not in player.badges:
             player.badges.append("🦄")
             new_badges.append("🦄")
-            new_achievements.append(f"{player.name} earned the Unicorn🦄 for winning after being behind in chips!")
+            new_achievements.append("unicorn")
         # 🎀 Bow Master: Earn all other badges
         all_badges = {"🍧", "🪷", "🦩", "🩰", "🌸", "💖", "🦄"}
         if all(b in player.badges for b in all_badges) and "🎀" not in player.badges:
             player.badges.append("🎀")
             new_badges.append("🎀")
-            new_achievements.append(f"{player.name} earned the Bow Master🎀 for earning all other badges!")
+            new_achievements.append("bow_master")
         # AI Mode exclusive badges
         if hasattr(self, 'vs_ai_mode') and self.vs_ai_mode:
             # 🧸 Beat the AI 3 times
             if player.wins >= 3 and "🧸" not in player.badges:
                 player.badges.append("🧸")
                 new_badges.append("🧸")
-                new_achievements.append(f"{player.name} earned the Teddy Bear🧸 for beating the AI 3 times!")
+                new_achievements.append("teddy_bear")
             # 🦋 Blackjack vs AI
             if blackjack and "🦋" not in player.badges:
                 player.badges.append("🦋")
                 new_badges.append("🦋")
-                new_achievements.append(f"{player.name} earned the Butterfly🦋 for getting a blackjack against the AI!")
+                new_achievements.append("butterfly")
         for ach in new_achievements:
-            if ach not in player.achievements:
-                player.achievements.append(ach)
+            record_achievement(player.achievements, ach)
         return new_badges, new_achievements
 
     def show_achievements_leaderboard(self):
@@ -1091,27 +1213,31 @@ class BlackjackGame:
 
         self.title = tk.Label(content_frame, text="🎀 Achievements + Leaderboard ✨", font=("Comic Sans MS", 18, "bold"), bg="#fff6fa", fg="#9933cc")
         self.title.pack(pady=10)
-        # Rankings by wins
-        sorted_by_wins = sorted(self.player_stats.items(), key=lambda x: x[1]["wins"], reverse=True)
+        # Rankings by wins; only the visible page of players is ever formatted into labels
+        by_wins = self.leaderboard.ranking("wins")
         win_frame = tk.LabelFrame(content_frame, text="By Wins", font=("Comic Sans MS", 14, "bold"), bg="#fff6fa", fg="#9933cc", bd=2, relief="groove", labelanchor="n")
         win_frame.pack(pady=10, padx=20, fill="x")
-        for i, (name, stats) in enumerate(sorted_by_wins, 1):
-            badges = ' '.join(stats["badges"])
-            label = tk.Label(win_frame, text=f"{i}. {name} - {stats['wins']} wins  {badges}", bg="#fff6fa", fg="#9933cc", font=("Comic Sans MS", 12))
-            label.pack(anchor="w", padx=10)
+
+        def win_rows(offset, limit):
+            return [f"{i}. {name} - {stats['wins']} wins  {' '.join(stats['badges'])}" for i, name, stats in by_wins.page(offset, limit)]
+        VirtualList(win_frame, len(by_wins), win_rows, LEADERBOARD_VISIBLE_ROWS, font=("Comic Sans MS", 12)).pack(fill="x")
         # Rankings by badge count
-        sorted_by_badges = sorted(self.player_stats.items(), key=lambda x: len(x[1]["badges"]), reverse=True)
+        by_badges = self.leaderboard.ranking("badges")
         badge_frame = tk.LabelFrame(content_frame, text="By Badges", font=("Comic Sans MS", 14, "bold"), bg="#fff6fa", fg="#9933cc", bd=2, relief="groove", labelanchor="n")
         badge_frame.pack(pady=10, padx=20, fill="x")
-        for i, (name, stats) in enumerate(sorted_by_badges, 1):
-            badges = ' '.join(stats["badges"])
-            label = tk.Label(badge_frame, text=f"{i}. {name} - {len(stats['badges'])} badges  {badges}", bg="#fff6fa", fg="#9933cc", font=("Comic Sans MS", 12))
-            label.pack(anchor="w", padx=10)
+
+        def badge_rows(offset, limit):
+            return [f"{i}. {name} - {len(stats['badges'])} badges  {' '.join(stats['badges'])}" for i, name, stats in by_badges.page(offset, limit)]
+        VirtualList(badge_frame, len(by_badges), badge_rows, LEADERBOARD_VISIBLE_ROWS, font=("Comic Sans MS", 12)).pack(fill="x")
         # Back button
         self.back_button = tk.Button(content_frame, text="Back", command=self.setup_start_screen)
         self.style_button(self.back_button)
         self.back_button.pack(pady=20)
 
+    def popup_ok(self, close_popup):
+        # Its own method so session recordings see OK clicks but not auto-closes
+        close_popup()
+
     def show_custom_message(self, title, message, on_close=None, auto_close_delay=None):
         """Displays a custom, in-UI message box."""
         # Frame to hold the popup, placed on the root to be on top
@@ -1138,36 +1264,59 @@ class BlackjackGame:
         message_label = tk.Label(content_frame, text=message, font=self.font_label, bg="#fff6fa", fg="#333333", wraplength=400, justify="center")
         message_label.pack(pady=10, padx=10)
 
-        ok_button = tk.Button(content_frame, text="OK", command=close_popup)
+        ok_button = tk.Button(content_frame, text="OK", command=lambda: self.popup_ok(close_popup))
         self.style_button(ok_button)
         ok_button.config(font=self.font_button, padx=25, pady=10)
         ok_button.pack(pady=20)
+        self.popup_ok_button = ok_button
 
         if auto_close_delay:
-            popup_frame.after(auto_close_delay, close_popup)
-
-    class AIPlayer(Player):
-        def __init__(self, game):
-            super().__init__("AI", chips=100)
-            self.is_ai = True
-            self.game = game
-        def place_bet(self, amount=None):
-            # AI bets a random amount between 10 and its chips, or all if less than 10
-            if self.chips < 10:
-                bet = self.chips
-            else:
-                bet = random.randint(10, min(50, self.chips))
-            self.bet = bet
-            self.chips -= bet
-            return True
-        def decide_hit(self, hand, dealer_upcard):
-            # Simple AI: hit if value < 16, else stand
-            # Use the game's calculate_hand_value method for consistent Ace handling
-            value = self.game.calculate_hand_value(hand)
-            return value < 16
+            self.clock.after(auto_close_delay, close_popup)
 
 
 if __name__ == '__main__':
     root = tk.Tk()
-    game = BlackjackGame(root)
+    startup_timing.mark("create Tk root")
+    game = BlackjackGame(root, game_clock.from_environment(root))
+    startup_timing.mark("build start screen")
+    # Optional features are imported only now, so they stay out of the models + storage import time
+    import shoe_pool
+    import decision_grader
+    import leaderboard_server
+    import game_metrics
+    import session_recorder
+    game.shoes = shoe_pool.from_environment()
+    game.decisions = decision_grader.from_environment()
+    profiler = profiling.from_environment()
+    if profiler:
+        profiling.instrument_game(profiler, game)
+        profiler.start()
+    leaderboard_http = leaderboard_server.from_environment(game.leaderboard)
+    metrics_exporters = game_metrics.from_environment(game.metrics)
+    recorder = session_recorder.from_environment(game)
+    startup_timing.mark("start optional features")
+    if startup_timing.enabled():
+        def _first_frame():
+            root.update_idletasks()
+            startup_timing.mark("first frame drawn")
+            print(startup_timing.report())
+        root.after_idle(_first_frame)
     root.mainloop()
+    if leaderboard_http:
+        leaderboard_http.close()
+    for exporter in metrics_exporters:
+        exporter.close()
+    if recorder:
+        recorder.close()
+    game.leaderboard.close()
+    game.snapshots.close()
+    if game._round_stats:
+        game._round_stats.close()
+    if game.decisions:
+        game.decisions.close()
+    if game.shoes:
+        game.shoes.close()
+    if game._coach:
+        game._coach.shutdown()
+    if profiler:
+        profiler.finish()
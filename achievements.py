@@ -0,0 +1,73 @@
+import time
+
+'''
+Achievement catalog for BlackJack Palace.
+Players' achievements are stored as compact IDs mapped to [first earned (unix time), times earned],
+e.g. {"ice_cream": [1697040000, 1]}, and only turned into sentences when a screen shows them.
+'''
+
+# id -> (badge, badge name, reason)
+ACHIEVEMENTS = {
+    "ice_cream": ("🍧", "Ice Cream", "for getting 21 exactly!"),
+    "pink_lotus": ("🪷", "Pink Lotus", "for getting five wins!"),
+    "flamingo": ("🦩", "Flamingo", "for winning 3 rounds in a row!"),
+    "ballet_slipper": ("🩰", "Ballet Slipper", "for winning with only face cards!"),
+    "cherry_blossom": ("🌸", "Cherry Blossom", "for winning with all hearts or diamonds!"),
+    "heart_gem": ("💖", "Heart Gem", "for winning with a blackjack!"),
+    "unicorn": ("🦄", "Unicorn", "for winning after being behind in chips!"),
+    "bow_master": ("🎀", "Bow Master", "for earning all other badges!"),
+    "teddy_bear": ("🧸", "Teddy Bear", "for beating the AI 3 times!"),
+    "butterfly": ("🦋", "Butterfly", "for getting a blackjack against the AI!"),
+}
+
+# Sentence endings written by older versions, used to migrate existing leaderboards
+_LEGACY_SUFFIXES = {f" earned the {name}{badge} {reason}": achievement_id
+                    for achievement_id, (badge, name, reason) in ACHIEVEMENTS.items()}
+
+
+def render_achievement(player_name, achievement_id):
+    entry = ACHIEVEMENTS.get(achievement_id)
+    if entry is None:
+        return achievement_id  # A sentence from an older version we couldn't map
+    badge, name, reason = entry
+    return f"{player_name} earned the {name}{badge} {reason}"
+
+
+def record_achievement(achievements, achievement_id, when=None):
+    """Add one award of an achievement to a player's achievement map"""
+    entry = achievements.get(achievement_id)
+    if entry is None:
+        achievements[achievement_id] = [int(time.time() if when is None else when), 1]
+    else:
+        entry[1] += 1
+
+
+def merge_achievements(into, other, counts="sum"):
+    """Fold another achievement map into `into`, keeping the earliest time.
+
+    counts is "sum" to add the times earned (independent machines) or "max" to keep the larger
+    one (copies of the same leaderboard).
+    """
+    for achievement_id, (earned, count) in other.items():
+        entry = into.get(achievement_id)
+        if entry is None:
+            into[achievement_id] = [earned, count]
+        else:
+            if earned is not None and (entry[0] is None or earned < entry[0]):
+                entry[0] = earned
+            entry[1] = max(entry[1], count) if counts == "max" else entry[1] + count
+    return into
+
+
+def migrate_achievements(achievements):
+    """Convert an old list of sentences into an achievement map (earned time unknown)"""
+    if isinstance(achievements, dict):
+        return achievements
+    migrated = {}
+    for sentence in achievements:
+        achievement_id = next((aid for suffix, aid in _LEGACY_SUFFIXES.items() if sentence.endswith(suffix)), sentence)
+        if achievement_id in migrated:
+            migrated[achievement_id][1] += 1
+        else:
+            migrated[achievement_id] = [None, 1]
+    return migrated
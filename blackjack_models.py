@@ -0,0 +1,140 @@
+import random
+
+'''
+Cards, players and table rules for BlackJack Palace.
+This module has no GUI dependencies, so headless tools (simulators, analysis scripts,
+servers) can import it without pulling in tkinter.
+'''
+
+SUITS = ['Hearts', 'Diamonds', 'Clubs', 'Spades']
+RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
+
+# How a seat's round was settled
+OUTCOME_LOSS = 0
+OUTCOME_WIN = 1
+OUTCOME_PUSH = 2
+OUTCOME_BLACKJACK = 3
+OUTCOME_BUST = 4
+OUTCOME_NAMES = ['loss', 'win', 'push', 'blackjack', 'bust']
+
+
+def calculate_hand_value(hand):
+    value = sum(card.value for card in hand)
+    aces = sum(1 for card in hand if card.rank == 'A')
+    while value > 21 and aces:
+        value -= 10
+        aces -= 1
+    return value
+
+
+# Card class
+class Card:
+    def __init__(self, suit, rank):
+        self.suit = suit
+        self.rank = rank
+        self.value = self.get_value()
+
+    def get_value(self):
+        if self.rank in ['J', 'Q', 'K']:
+            return 10
+        elif self.rank == 'A':
+            return 11
+        else:
+            return int(self.rank)
+
+    def __str__(self):
+        return f"{self.rank} of {self.suit}"
+
+# Deck class
+class Deck:
+    def __init__(self, cards=None):
+        # Pass cards to rebuild a deck in a known order (e.g. from a round snapshot)
+        if cards is None:
+            cards = [Card(suit, rank) for suit in SUITS for rank in RANKS]
+            random.shuffle(cards)
+        self.cards = cards
+
+    def deal_card(self):
+        return self.cards.pop()
+
+# Player class
+class Player:
+    def __init__(self, name, chips=100, wins=0, badges=None, achievements=None):
+        self.name = name
+        self.hand = []
+        self.chips = chips
+        self.bet = 0
+        self.wins = wins
+        self.badges = badges if badges is not None else []
+        # Achievement id -> [first earned (unix time), times earned]
+        self.achievements = achievements if achievements is not None else {}
+        self.doubled_down = False
+        self.insurance_bet = 0
+
+    def place_bet(self, amount):
+        if amount <= self.chips:
+            self.bet = amount
+            self.chips -= amount
+            return True
+        return False
+
+    def win_bet(self, is_blackjack=False):
+        if is_blackjack:
+            # Blackjack pays 3:2 (1.5x the bet)
+            self.chips += int(2.5 * self.bet)
+        else:
+            # Regular win pays 1:1 (2x the bet total)
+            self.chips += 2 * self.bet
+        self.bet = 0
+
+    def push_bet(self):
+        self.chips += self.bet
+        self.bet = 0
+
+    def double_down(self):
+        """Double the bet and mark player as doubled down"""
+        if self.chips >= self.bet:
+            self.chips -= self.bet
+            self.bet *= 2
+            self.doubled_down = True
+            return True
+        return False
+
+    def reset_hand(self):
+        self.hand = []
+        self.doubled_down = False
+        # Insurance belongs to one round; it is placed after the deal and settled with the round
+        self.insurance_bet = 0
+
+# Dealer class
+class Dealer(Player):
+    def __init__(self):
+        super().__init__('Dealer')
+
+    def should_hit(self):
+        return self.get_hand_value() < 17
+
+    def get_hand_value(self):
+        return calculate_hand_value(self.hand)
+
+# AI opponent
+class AIPlayer(Player):
+    def __init__(self, game=None):
+        super().__init__("AI", chips=100)
+        self.is_ai = True
+        self.game = game
+
+    def place_bet(self, amount=None):
+        # AI bets a random amount between 10 and its chips, or all if less than 10
+        if self.chips < 10:
+            bet = self.chips
+        else:
+            bet = random.randint(10, min(50, self.chips))
+        self.bet = bet
+        self.chips -= bet
+        return True
+
+    def decide_hit(self, hand, dealer_upcard):
+        # Simple AI: hit if value < 16, else stand
+        value = calculate_hand_value(hand)
+        return value < 16
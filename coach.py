@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from house_edge import EVCalculator, HouseRules, composition_from_cards, rank_index, hand_state, remove_card
+
+'''
+Live hit/stand/double advice for the coaching overlay.
+Expected values come from the cards actually left in the shoe (plus the dealer's unseen
+hole card). The solver runs on one background thread so the Tk loop never waits on it,
+and every answer also pre-solves the hands one card away, so the overlay after a hit is
+a dictionary lookup.
+'''
+
+ACTIONS = ['stand', 'hit', 'double']
+
+
+class Coach:
+    def __init__(self, rules=None):
+        self.calculator = EVCalculator(rules or HouseRules())
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="palace-coach")
+        self._results = {}
+
+    @staticmethod
+    def position(deck_cards, hole_card, upcard, hand):
+        """Key describing what the player can't see, the dealer upcard and the player's hand"""
+        comp = composition_from_cards(list(deck_cards) + [hole_card])
+        return comp, rank_index(upcard.rank), tuple(sorted(rank_index(card.rank) for card in hand))
+
+    def lookup(self, position):
+        """Advice for a position if it has already been solved, else None"""
+        return self._results.get(position)
+
+    def advise(self, position):
+        """Return a Future resolving to the advice for a position"""
+        return self._executor.submit(self._solve, position)
+
+    def new_shoe(self):
+        """Forget everything about the previous deck"""
+        self._results = {}
+        self._executor.submit(self.calculator.clear)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def _advice(self, position):
+        advice = self._results.get(position)
+        if advice is None:
+            comp, upcard, hand = position
+            advice = dict(self.calculator.decision_evs(comp, upcard, list(hand)))
+            advice["best"] = max((action for action in ACTIONS if action in advice), key=advice.get)
+            advice["bust"] = self.calculator.bust_probability(comp, list(hand))
+            self._results[position] = advice
+        return advice
+
+    def _solve(self, position):
+        advice = self._advice(position)
+        # The hit EV above already walked every next card, so these are memo lookups
+        comp, upcard, hand = position
+        for i, count in enumerate(comp):
+            if count:
+                child_hand = tuple(sorted(hand + (i,)))
+                hard, has_ace = hand_state(child_hand)
+                if hard <= 21:
+                    self._advice((remove_card(comp, i), upcard, child_hand))
+        return advice
+
+
+def format_advice(advice):
+    parts = [f"Bust if you hit: {advice['bust'] * 100:.0f}%"]
+    for action in ACTIONS:
+        if action in advice:
+            star = "⭐" if action == advice["best"] else ""
+            parts.append(f"{star}{action.title()} EV {advice[action]:+.2f}")
+    return "🎓 " + "  |  ".join(parts)
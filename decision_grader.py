@@ -0,0 +1,287 @@
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+from house_edge import HouseRules, HouseEdgeCache, RANK_LABELS, composition_from_cards, rank_index
+from round_state import encode_cards, decode_cards
+
+'''
+Post-game decision grading for BlackJack Palace.
+With --decision-log [DIR] (or PALACE_DECISION_LOG=DIR) every hit, stand, double and insurance
+choice is appended to a session file in decision_logs/ together with the cards on the table and
+the exact order of the remaining deck. A background thread does the encoding and writing, and
+starts a new file once one reaches DEFAULT_MAX_FILE_BYTES; turns that ran out the clock are
+logged as "timeout" and left out of the grades.
+Afterwards the grader works out the expected value of every option the player had against the
+cards that were really left (the dealer's hole card included, since the player couldn't see it)
+and reports what each choice cost compared with optimal play, per player.
+Decisions from many sessions often share a state; each distinct state is solved once, on a
+process pool, and its values are kept in house_edge_cache/ for every later run.
+Run with: python3 decision_grader.py decision_logs/ [--workers 4] [--player Serena]
+'''
+
+DEFAULT_DECISIONS_DIR = "decision_logs"
+# Decisions that lose less than this (in units of the bet) count as optimal
+TOLERANCE = 1e-9
+# Distinct states sent to a worker at once; states are grouped by remaining cards so a chunk shares memo work
+CHUNK_SIZE = 64
+WORST_SHOWN = 5
+INSURANCE_ACTIONS = ["insurance", "no_insurance"]
+# Logged when the turn timer stood for the player; kept for the record but not graded
+TIMEOUT = "timeout"
+DEFAULT_MAX_PENDING = 1000
+DEFAULT_MAX_FILE_BYTES = 16 << 20
+
+
+class DecisionLog:
+    """Logs decisions as JSON lines from a writer thread, so the Tk thread only queues them.
+
+    At most max_pending decisions wait to be written; past that new ones are dropped (and
+    counted) rather than making the table wait on the disk.
+    """
+
+    def __init__(self, directory=DEFAULT_DECISIONS_DIR, max_pending=DEFAULT_MAX_PENDING,
+                 max_file_bytes=DEFAULT_MAX_FILE_BYTES):
+        self.directory = directory
+        self.max_file_bytes = max_file_bytes
+        self.path = None
+        self.dropped = 0
+        self._file = None
+        self._parts = 0
+        self._queue = queue.Queue(max_pending)
+        self._thread = threading.Thread(target=self._run, name="decision-log", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def record(self, player, action, deck_cards, dealer_hand, can_double=False, stake=0):
+        # Cards are only copied here; encoding them is left to the writer thread
+        item = (time.time(), player.name, action, list(player.hand), list(dealer_hand), list(deck_cards),
+                player.bet, can_double, stake)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Write everything queued, then stop the writer thread"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            self._write(item)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self):
+        if self._file is not None:
+            self._file.close()
+        os.makedirs(self.directory, exist_ok=True)
+        self._parts += 1
+        # Zero-padded part numbers keep a session's files in order when sorted by name
+        self.path = os.path.join(self.directory, time.strftime("session-%Y%m%d-%H%M%S") + f"-{self._parts:03d}.jsonl")
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _write(self, item):
+        when, name, action, hand, dealer_hand, deck_cards, bet, can_double, stake = item
+        entry = {
+            "t": when,
+            "player": name,
+            "action": action,
+            "hand": encode_cards(hand),
+            "dealer": encode_cards(dealer_hand),
+            "deck": encode_cards(deck_cards),
+            "bet": bet,
+            "can_double": can_double,
+        }
+        if stake:
+            entry["stake"] = stake
+        try:
+            if self._file is None or self._file.tell() >= self.max_file_bytes:
+                self._open()
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+        except OSError:
+            self.dropped += 1
+
+
+def from_environment(argv=None):
+    """Start a DecisionLog if --decision-log [DIR] or PALACE_DECISION_LOG=DIR asks for one"""
+    argv = sys.argv[1:] if argv is None else argv
+    directory = os.environ.get("PALACE_DECISION_LOG")
+    if "--decision-log" in argv:
+        index = argv.index("--decision-log")
+        has_value = index + 1 < len(argv) and not argv[index + 1].startswith("--")
+        directory = argv[index + 1] if has_value else DEFAULT_DECISIONS_DIR
+    return DecisionLog(directory).start() if directory else None
+
+
+def load_decisions(paths):
+    """Decision entries from session files and/or directories of them, oldest file first"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".jsonl")))
+        else:
+            files.append(path)
+    entries = []
+    for path in files:
+        with open(path, "r", encoding="utf-8") as f:
+            entries.extend(json.loads(line) for line in f if line.strip())
+    return entries
+
+
+def decision_state(entry):
+    """Hashable description of what was left to decide: (kind, unseen composition, upcard, hand, can double)"""
+    dealer = decode_cards(entry["dealer"])
+    # The player never saw the hole card, so it is part of what could still come
+    comp = composition_from_cards(decode_cards(entry["deck"]) + dealer[1:])
+    upcard = rank_index(dealer[0].rank)
+    if entry["action"] in INSURANCE_ACTIONS:
+        return ("insurance", comp, upcard, (), False)
+    hand = tuple(sorted(rank_index(card.rank) for card in decode_cards(entry["hand"])))
+    return ("play", comp, upcard, hand, bool(entry.get("can_double")))
+
+
+def state_key(state):
+    kind, comp, upcard, hand, can_double = state
+    return f"{kind}|{','.join(map(str, comp))}|{upcard}|{','.join(map(str, hand))}|{int(can_double)}"
+
+
+# One calculator per worker process, so memoized dealer and hit results carry over between chunks
+_calculator = None
+
+
+def _init_worker(rules):
+    global _calculator
+    from house_edge import EVCalculator
+    _calculator = EVCalculator(rules)
+
+
+def option_values(calculator, state):
+    """{action: expected value in units of the original bet} for every option the player had"""
+    kind, comp, upcard, hand, can_double = state
+    if kind == "insurance":
+        # Insurance costs half the bet and pays 2:1; declining leaves nothing at stake
+        return {"insurance": 0.5 * calculator.insurance_ev(comp), "no_insurance": 0.0}
+    values = calculator.decision_evs(comp, upcard, list(hand))
+    if not can_double:
+        values.pop("double", None)
+    return values
+
+
+def _solve_chunk(states):
+    results = {}
+    for state in states:
+        results[state_key(state)] = option_values(_calculator, state)
+    if len(_calculator._hit_memo) > 500000:
+        _calculator.clear()
+    return results
+
+
+def solve_states(states, rules, workers=None, cache=None):
+    """{state key: option values} for every state, solving only the ones not cached yet"""
+    cache = cache if cache is not None else HouseEdgeCache()
+    known = cache.get(rules, "decisions") or {}
+    missing = sorted({state for state in states if state_key(state) not in known}, key=lambda state: state[1:3])
+    if missing:
+        from concurrent.futures import ProcessPoolExecutor
+        chunks = [missing[i:i + CHUNK_SIZE] for i in range(0, len(missing), CHUNK_SIZE)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rules,)) as pool:
+            for solved in pool.map(_solve_chunk, chunks):
+                known.update(solved)
+        cache.put(rules, known, "decisions")
+    return known, len(missing)
+
+
+def describe(entry):
+    dealer = decode_cards(entry["dealer"])
+    hand = decode_cards(entry["hand"])
+    cards = ' '.join(RANK_LABELS[rank_index(card.rank)] for card in hand)
+    return f"{cards} vs {RANK_LABELS[rank_index(dealer[0].rank)]}"
+
+
+def grade(entries, rules=None, workers=None, cache=None):
+    """Per-player mistake report for a list of decision entries"""
+    rules = rules or HouseRules()
+    players = {}
+
+    def player_report(name):
+        return players.setdefault(name, {
+            "decisions": 0, "timeouts": 0, "mistakes": 0, "ev_lost": 0.0, "chips_lost": 0.0, "by_mistake": {}, "worst": [],
+        })
+    # The clock standing for a player isn't their choice, so timeouts are counted but not graded
+    for entry in entries:
+        if entry["action"] == TIMEOUT:
+            player_report(entry["player"])["timeouts"] += 1
+    entries = [entry for entry in entries if entry["action"] != TIMEOUT]
+    states = [decision_state(entry) for entry in entries]
+    values, solved = solve_states(states, rules, workers, cache)
+    for entry, state in zip(entries, states):
+        options = values[state_key(state)]
+        best = max(options, key=options.get)
+        chosen = entry["action"]
+        if chosen not in options:
+            raise ValueError(f"{entry['player']} chose {chosen} on {describe(entry)}, which has no value to grade it by")
+        loss = options[best] - options[chosen]
+        report = player_report(entry["player"])
+        report["decisions"] += 1
+        if loss <= TOLERANCE:
+            continue
+        report["mistakes"] += 1
+        report["ev_lost"] += loss
+        report["chips_lost"] += loss * entry["bet"]
+        mistake = f"{chosen} instead of {best}"
+        report["by_mistake"][mistake] = report["by_mistake"].get(mistake, 0) + 1
+        report["worst"].append({"hand": describe(entry), "chose": chosen, "best": best, "ev_lost": loss,
+                                "chips_lost": loss * entry["bet"], "t": entry["t"]})
+    for report in players.values():
+        report["worst"] = sorted(report["worst"], key=lambda item: -item["chips_lost"])[:WORST_SHOWN]
+    return {"decisions": len(entries), "distinct_states": len(set(states)), "solved": solved, "players": players}
+
+
+def format_report(report):
+    lines = [f"{report['decisions']} decisions, {report['distinct_states']} distinct states "
+             f"({report['solved']} solved, the rest cached)"]
+    for name, player in sorted(report["players"].items(), key=lambda item: -item[1]["chips_lost"]):
+        rate = player["mistakes"] / player["decisions"] * 100 if player["decisions"] else 0.0
+        timeouts = f", {player['timeouts']} timeouts not graded" if player["timeouts"] else ""
+        lines.append(f"{name}: {player['mistakes']}/{player['decisions']} mistakes ({rate:.1f}%), "
+                     f"EV lost {player['ev_lost']:.3f} bets = {player['chips_lost']:.1f} chips{timeouts}")
+        for mistake, count in sorted(player["by_mistake"].items(), key=lambda item: -item[1]):
+            lines.append(f"    {count:>5} x {mistake}")
+        for worst in player["worst"]:
+            lines.append(f"    worst: {worst['hand']}: {worst['chose']} instead of {worst['best']} "
+                         f"(-{worst['ev_lost']:.3f} bets, -{worst['chips_lost']:.1f} chips)")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade recorded BlackJack Palace decisions against optimal play")
+    parser.add_argument("paths", nargs="*", default=[DEFAULT_DECISIONS_DIR], help="session files or directories")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--player", help="only grade this player's decisions")
+    parser.add_argument("--h17", action="store_true", help="dealer hits soft 17")
+    parser.add_argument("--cache-dir", default="house_edge_cache")
+    parser.add_argument("--json", action="store_true", help="print the raw report as JSON")
+    args = parser.parse_args(argv)
+    entries = load_decisions(args.paths)
+    if args.player:
+        entries = [entry for entry in entries if entry["player"] == args.player]
+    report = grade(entries, HouseRules(dealer_hits_soft_17=args.h17), args.workers, HouseEdgeCache(args.cache_dir))
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+import heapq
+import os
+import sys
+
+'''
+Clocks that pace BlackJack Palace's screens (shuffle animation, AI thinking time,
+bust popups, the turn timer, ...). The game schedules every delay through one of these
+instead of calling root.after directly, so the whole flow can be sped up or made instant.
+  RealClock(root)              normal play
+  RealClock(root, speed=10)    every delay 10x shorter, for demos and attract mode
+  VirtualClock()               nothing runs until advance()/run_until_idle(), for UI tests
+  VirtualClock(root)           runs every delay as soon as Tk is free, for unlimited speed
+Pick one from the command line with --speed N (0 means unlimited) or PALACE_SPEED=N.
+A person's decision window is scheduled with after_real(), which every clock with a Tk
+root keeps in wall-clock time, so sped-up or unlimited tables stay playable.
+'''
+
+
+class RealClock:
+    def __init__(self, root, speed=1.0):
+        if speed <= 0:
+            raise ValueError("speed must be positive; use VirtualClock for unlimited speed")
+        self.root = root
+        self.speed = speed
+
+    def after(self, ms, callback, *args):
+        return self.root.after(int(ms / self.speed), callback, *args)
+
+    def after_real(self, ms, callback, *args):
+        """Schedule in wall-clock time whatever the speed (e.g. the human turn timer)"""
+        return self.root.after(ms, callback, *args)
+
+    def after_cancel(self, timer_id):
+        self.root.after_cancel(timer_id)
+
+
+class VirtualClock:
+    """Keeps its own time in milliseconds and fires callbacks in due order.
+
+    With a Tk root it drains itself one callback per event-loop turn, so screens still
+    get drawn in between; without one, the caller drives time explicitly.
+    """
+
+    def __init__(self, root=None):
+        self.root = root
+        self.now = 0
+        self._queue = []
+        self._live = set()
+        self._next_id = 0
+        self._drain_scheduled = False
+
+    def after(self, ms, callback, *args):
+        self._next_id += 1
+        heapq.heappush(self._queue, (self.now + ms, self._next_id, callback, args))
+        self._live.add(self._next_id)
+        self._schedule_drain()
+        return self._next_id
+
+    def after_real(self, ms, callback, *args):
+        """Wall-clock delay through Tk when there is a root; otherwise just another virtual delay"""
+        if self.root is not None:
+            return self.root.after(ms, callback, *args)
+        return self.after(ms, callback, *args)
+
+    def after_cancel(self, timer_id):
+        # Tk after ids are strings; virtual timers are ints
+        if isinstance(timer_id, str):
+            self.root.after_cancel(timer_id)
+        else:
+            self._live.discard(timer_id)
+
+    def pending(self):
+        return len(self._live)
+
+    def _drop_cancelled(self):
+        while self._queue and self._queue[0][1] not in self._live:
+            heapq.heappop(self._queue)
+
+    def step(self, deadline=None):
+        """Run the next due callback, jumping time forward to it.
+
+        Returns False when idle, or when the next callback is due after deadline.
+        """
+        self._drop_cancelled()
+        if self._queue and (deadline is None or self._queue[0][0] <= deadline):
+            due, timer_id, callback, args = heapq.heappop(self._queue)
+            self._live.discard(timer_id)
+            self.now = max(self.now, due)
+            callback(*args)
+            return True
+        return False
+
+    def advance(self, ms):
+        """Move time forward by ms, running everything that falls due on the way"""
+        target = self.now + ms
+        while self.step(deadline=target):
+            pass
+        self.now = max(self.now, target)
+
+    def run_until_idle(self, max_steps=100000):
+        """Run callbacks until nothing is scheduled; returns the number run"""
+        steps = 0
+        while steps < max_steps and self.step():
+            steps += 1
+        return steps
+
+    def _schedule_drain(self):
+        if self.root is not None and not self._drain_scheduled:
+            self._drain_scheduled = True
+            self.root.after(0, self._drain)
+
+    def _drain(self):
+        self._drain_scheduled = False
+        self.step()
+        if self._queue:
+            self._schedule_drain()
+
+
+def from_environment(root, argv=None):
+    """Build the clock selected by --speed / PALACE_SPEED (real time by default)"""
+    argv = sys.argv[1:] if argv is None else argv
+    speed = os.environ.get("PALACE_SPEED", "1")
+    if "--speed" in argv:
+        index = argv.index("--speed")
+        if index + 1 < len(argv):
+            speed = argv[index + 1]
+    try:
+        speed = float(speed)
+    except ValueError:
+        print(f"Ignoring bad speed {speed!r}; playing at normal speed", file=sys.stderr)
+        speed = 1.0
+    if speed < 0:
+        print(f"Ignoring negative speed {speed:g}; playing at normal speed", file=sys.stderr)
+        speed = 1.0
+    if speed == 0:
+        return VirtualClock(root)
+    return RealClock(root, speed)
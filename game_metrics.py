@@ -0,0 +1,270 @@
+import bisect
+import collections
+import os
+import sys
+import threading
+import time
+
+'''
+Table metrics for BlackJack Palace in the Prometheus text exposition format.
+The game updates plain counters and histograms as rounds are played (a few integer
+additions per event, always on). An exporter renders them off the Tk thread, either
+rewriting a file for node_exporter's textfile collector or answering GET /metrics on a
+local port:
+  --metrics-file palace.prom   or PALACE_METRICS_FILE=palace.prom
+  --metrics-port 9464          or PALACE_METRICS_PORT=9464
+'''
+
+# start_timer gives a human player 15 seconds before the auto-stand
+DECISION_WINDOW_SECONDS = 15
+DECISION_BUCKETS = [0.5, 1, 2, 3, 5, 8, 10, 12, 15]
+HANDS_RATE_WINDOW = 60.0
+FILE_INTERVAL = 5.0
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Counter:
+    def __init__(self, name, help_text, label=None):
+        self.name = name
+        self.help = help_text
+        # Optional single label name; values are then kept per label value
+        self.label = label
+        self.values = collections.defaultdict(int)
+
+    def inc(self, amount=1, label_value=""):
+        self.values[label_value] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        if self.label is None:
+            lines.append(f"{self.name} {self.values['']}")
+        else:
+            for value, count in sorted(self.values.items()):
+                lines.append(f'{self.name}{{{self.label}="{value}"}} {count}')
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.read():g}"]
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help = help_text
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets + ["+Inf"], self.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {self.sum:g}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+
+class GameMetrics:
+    def __init__(self):
+        self.rounds_started = Counter("palace_rounds_started_total", "Rounds dealt")
+        self.rounds_finished = Counter("palace_rounds_finished_total", "Rounds settled")
+        self.hands = Counter("palace_hands_settled_total", "Player hands settled")
+        self.outcomes = Counter("palace_hand_outcomes_total", "Settled hands by outcome", label="outcome")
+        self.decision_seconds = Histogram("palace_decision_seconds", "Time a player took to hit, stand or double", DECISION_BUCKETS)
+        self.auto_stands = Counter("palace_auto_stand_timeouts_total", "Turns that ran out the decision window")
+        self.busts = Counter("palace_busts_total", "Player hands that went over 21")
+        self.naturals = Counter("palace_naturals_total", "Natural blackjacks dealt", label="seat")
+        self.insurance_taken = Counter("palace_insurance_taken_total", "Insurance bets taken")
+        self.insurance_paid = Counter("palace_insurance_paid_total", "Insurance bets paid out")
+        self.insurance_chips_taken = Counter("palace_insurance_chips_taken_total", "Chips staked on insurance")
+        self.insurance_chips_paid = Counter("palace_insurance_chips_paid_total", "Chips paid back on insurance, stake included")
+        self.double_downs = Counter("palace_double_downs_total", "Double downs")
+        self.house_won = Counter("palace_house_chips_won_total", "Chips the house won in rounds it came out ahead")
+        self.house_lost = Counter("palace_house_chips_lost_total", "Chips the house paid out in rounds it came out behind")
+        self.started = time.monotonic()
+        # (time, hands) per round inside HANDS_RATE_WINDOW; trimmed by the Tk thread and the exporters
+        self._recent_hands = collections.deque()
+        self._recent_lock = threading.Lock()
+        self._decision_start = None
+        self.metrics = [
+            self.rounds_started, self.rounds_finished, self.hands,
+            Gauge("palace_hands_per_second", f"Hands settled per second over the last {HANDS_RATE_WINDOW:g} s", self.hands_per_second),
+            self.outcomes, self.decision_seconds,
+            Gauge("palace_decision_window_seconds", "Seconds a player has before the auto-stand", lambda: DECISION_WINDOW_SECONDS),
+            self.auto_stands, self.busts, self.naturals,
+            self.insurance_taken, self.insurance_paid, self.insurance_chips_taken, self.insurance_chips_paid,
+            self.double_downs, self.house_won, self.house_lost,
+            Gauge("palace_house_net_chips", "Chips won (positive) or lost by the house since start", self.house_net),
+        ]
+
+    # Events from the game
+    def round_started(self):
+        self.rounds_started.inc()
+
+    def round_finished(self, outcome_counts, house_net):
+        hands = sum(outcome_counts.values())
+        self.rounds_finished.inc()
+        self.hands.inc(hands)
+        for outcome, count in outcome_counts.items():
+            if count:
+                self.outcomes.inc(count, outcome)
+        self.busts.inc(outcome_counts.get("bust", 0))
+        if house_net >= 0:
+            self.house_won.inc(house_net)
+        else:
+            self.house_lost.inc(-house_net)
+        now = time.monotonic()
+        with self._recent_lock:
+            self._recent_hands.append((now, hands))
+            self._drop_old_hands(now)
+
+    def decision_started(self):
+        self._decision_start = time.monotonic()
+
+    def decision_made(self):
+        if self._decision_start is not None:
+            self.decision_seconds.observe(time.monotonic() - self._decision_start)
+            self._decision_start = None
+
+    def auto_stand(self):
+        self._decision_start = None
+        self.auto_stands.inc()
+
+    def natural(self, seat):
+        self.naturals.inc(1, seat)
+
+    def insurance(self, stake, paid=0):
+        if paid:
+            self.insurance_paid.inc()
+            self.insurance_chips_paid.inc(paid)
+        else:
+            self.insurance_taken.inc()
+            self.insurance_chips_taken.inc(stake)
+
+    def double_down(self):
+        self.double_downs.inc()
+
+    # Derived values
+    def _drop_old_hands(self, now):
+        cutoff = now - HANDS_RATE_WINDOW
+        recent = self._recent_hands
+        while recent and recent[0][0] < cutoff:
+            recent.popleft()
+
+    def hands_per_second(self):
+        now = time.monotonic()
+        with self._recent_lock:
+            self._drop_old_hands(now)
+            hands = sum(count for _, count in self._recent_hands)
+        window = min(HANDS_RATE_WINDOW, now - self.started) or 1.0
+        return hands / window
+
+    def house_net(self):
+        return self.house_won.values[''] - self.house_lost.values['']
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsFileExporter:
+    """Rewrites a .prom file every interval seconds (and once more on close)"""
+
+    def __init__(self, metrics, path, interval=FILE_INTERVAL):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-file", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def write(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.metrics.render())
+        os.replace(tmp_path, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.write()
+
+
+class MetricsHTTPExporter:
+    """Answers GET /metrics on a local port"""
+
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        # Imported here so the game itself (which always has a GameMetrics) never loads http.server
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="metrics-http", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.httpd.shutdown()
+        self._thread.join()
+        self.httpd.server_close()
+
+
+def _option(argv, flag, env):
+    value = os.environ.get(env)
+    if flag in argv:
+        index = argv.index(flag)
+        if index + 1 < len(argv):
+            value = argv[index + 1]
+    return value
+
+
+def from_environment(metrics, argv=None):
+    """Start the exporters asked for on the command line or environment; returns them as a list"""
+    argv = sys.argv[1:] if argv is None else argv
+    exporters = []
+    path = _option(argv, "--metrics-file", "PALACE_METRICS_FILE")
+    if path:
+        exporters.append(MetricsFileExporter(metrics, path).start())
+    port = _option(argv, "--metrics-port", "PALACE_METRICS_PORT")
+    if port:
+        exporters.append(MetricsHTTPExporter(metrics, int(port)).start())
+    return exporters
@@ -0,0 +1,486 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+'''
+Exact house-edge calculator for BlackJack Palace rule variants.
+Every number comes from a memoized walk over the real shoe composition (no sampling),
+and finished reports are cached on disk keyed by a hash of the rules.
+Run with: python3 house_edge.py --decks 6 --h17 --payout 1.2
+'''
+
+# Rank indexes used by the analysis: 0 is the Ace, 1-8 are 2-9 and 9 is every ten-valued card
+TEN = 9
+ACE = 0
+RANK_LABELS = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10']
+DEALER_TOTALS = ['17', '18', '19', '20', '21', 'bust']
+DOUBLE_RULES = {
+    'any': None,
+    '9-11': (9, 10, 11),
+    '10-11': (10, 11),
+    'none': (),
+}
+CACHE_VERSION = 4
+
+
+def rank_index(rank):
+    """Map a Card rank ('2'..'10', 'J', 'Q', 'K', 'A') to an analysis rank index"""
+    if rank == 'A':
+        return ACE
+    if rank in ('10', 'J', 'Q', 'K'):
+        return TEN
+    return int(rank) - 1
+
+
+def composition_from_cards(cards):
+    """Count a list of Card objects into a composition tuple"""
+    counts = [0] * 10
+    for card in cards:
+        counts[rank_index(card.rank)] += 1
+    return tuple(counts)
+
+
+def full_shoe(decks):
+    return tuple([4 * decks] * 9 + [16 * decks])
+
+
+def hand_state(hand_indexes):
+    """Return (hard_total, has_ace) for a list of rank indexes"""
+    return sum(i + 1 for i in hand_indexes), ACE in hand_indexes
+
+
+def payoff_key(multiple):
+    """JSON key for a net result in units of the bet (e.g. -2 for a lost double, 1.5 for blackjack)"""
+    return f"{multiple:g}"
+
+
+def best_total(hard, has_ace):
+    if has_ace and hard + 10 <= 21:
+        return hard + 10
+    return hard
+
+
+def remove_card(comp, i):
+    return comp[:i] + (comp[i] - 1,) + comp[i + 1:]
+
+
+class HouseRules:
+    """A rule variant. The defaults match the game as it is played today."""
+
+    def __init__(self, decks=1, dealer_hits_soft_17=False, blackjack_payout=1.5, double_on='any', insurance=True):
+        if decks < 1:
+            raise ValueError("decks must be at least 1")
+        if double_on not in DOUBLE_RULES:
+            raise ValueError(f"double_on must be one of {', '.join(DOUBLE_RULES)}")
+        self.decks = int(decks)
+        self.dealer_hits_soft_17 = bool(dealer_hits_soft_17)
+        self.blackjack_payout = float(blackjack_payout)
+        self.double_on = double_on
+        self.insurance = bool(insurance)
+
+    def to_dict(self):
+        return {
+            "decks": self.decks,
+            "dealer_hits_soft_17": self.dealer_hits_soft_17,
+            "blackjack_payout": self.blackjack_payout,
+            "double_on": self.double_on,
+            "insurance": self.insurance,
+        }
+
+    def cache_key(self):
+        payload = json.dumps({"version": CACHE_VERSION, "rules": self.to_dict()}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def can_double(self, hard, has_ace, num_cards):
+        if num_cards != 2:
+            return False
+        allowed = DOUBLE_RULES[self.double_on]
+        if allowed is None:
+            return True
+        # Restricted doubling only applies to hard totals
+        return not (has_ace and hard + 10 <= 21) and hard in allowed
+
+
+class EVCalculator:
+    """Composition-dependent expected values for one rule set.
+
+    A composition is a tuple of 10 counts (see RANK_LABELS) holding every card the player
+    has not seen, which includes the dealer's hole card. All results assume the dealer has
+    already checked for blackjack, exactly like the game does before any player turn.
+    Results are memoized per composition so repeated or incremental queries are cheap.
+    """
+
+    def __init__(self, rules=None):
+        self.rules = rules or HouseRules()
+        self.clear()
+
+    def clear(self):
+        self._dealer_memo = {}
+        self._upcard_memo = {}
+        self._hit_memo = {}
+
+    # Dealer side
+    def _dealer_from(self, comp, hard, has_ace):
+        key = (comp, hard, has_ace)
+        result = self._dealer_memo.get(key)
+        if result is not None:
+            return result
+        total = best_total(hard, has_ace)
+        soft = has_ace and hard + 10 <= 21
+        if hard > 21:
+            result = (0.0, 0.0, 0.0, 0.0, 0.0, 1.0)
+        elif total >= 17 and not (self.rules.dealer_hits_soft_17 and total == 17 and soft):
+            dist = [0.0] * 6
+            dist[total - 17] = 1.0
+            result = tuple(dist)
+        else:
+            n = sum(comp)
+            dist = [0.0] * 6
+            for i, count in enumerate(comp):
+                if count:
+                    p = count / n
+                    sub = self._dealer_from(remove_card(comp, i), hard + i + 1, has_ace or i == ACE)
+                    for k in range(6):
+                        dist[k] += p * sub[k]
+            result = tuple(dist)
+        self._dealer_memo[key] = result
+        return result
+
+    def dealer_blackjack_probability(self, comp, upcard):
+        """Chance the unseen hole card completes a dealer blackjack"""
+        n = sum(comp)
+        if upcard == ACE:
+            return comp[TEN] / n
+        if upcard == TEN:
+            return comp[ACE] / n
+        return 0.0
+
+    def dealer_distribution(self, comp, upcard):
+        """Final dealer totals (17-21, bust) given the upcard, with no dealer blackjack"""
+        key = (comp, upcard)
+        result = self._upcard_memo.get(key)
+        if result is not None:
+            return result
+        forbidden = TEN if upcard == ACE else ACE if upcard == TEN else None
+        n = sum(comp) - (comp[forbidden] if forbidden is not None else 0)
+        dist = [0.0] * 6
+        for i, count in enumerate(comp):
+            if count and i != forbidden:
+                p = count / n
+                sub = self._dealer_from(remove_card(comp, i), upcard + i + 2, upcard == ACE or i == ACE)
+                for k in range(6):
+                    dist[k] += p * sub[k]
+        result = tuple(dist)
+        self._upcard_memo[key] = result
+        return result
+
+    # Player side. Outcome vectors are (ev, win, push, loss, bust, doubled).
+    def _stand_vector(self, comp, upcard, total):
+        if total > 21:
+            return (-1.0, 0.0, 0.0, 1.0, 1.0, 0.0)
+        dist = self.dealer_distribution(comp, upcard)
+        win = dist[5]
+        push = 0.0
+        for k in range(5):
+            if total > 17 + k:
+                win += dist[k]
+            elif total == 17 + k:
+                push = dist[k]
+        loss = 1.0 - win - push
+        return (win - loss, win, push, loss, 0.0, 0.0)
+
+    def _hit_vectors(self, comp, upcard, hard, has_ace):
+        """Return (hit vector, best of hit/stand vector) for a hand that may keep drawing"""
+        key = (comp, upcard, hard, has_ace)
+        result = self._hit_memo.get(key)
+        if result is not None:
+            return result
+        total = best_total(hard, has_ace)
+        stand = self._stand_vector(comp, upcard, total)
+        if hard > 21:
+            result = (stand, stand)
+        else:
+            # Hitting 21 is never right, but the game allows it, so it still gets a value to grade
+            n = sum(comp)
+            hit = [0.0] * 6
+            for i, count in enumerate(comp):
+                if count:
+                    p = count / n
+                    sub = self._hit_vectors(remove_card(comp, i), upcard, hard + i + 1, has_ace or i == ACE)[1]
+                    for k in range(6):
+                        hit[k] += p * sub[k]
+            hit = tuple(hit)
+            result = (hit, hit if hit[0] > stand[0] else stand)
+        self._hit_memo[key] = result
+        return result
+
+    def _double_vector(self, comp, upcard, hard, has_ace):
+        n = sum(comp)
+        vec = [0.0] * 6
+        for i, count in enumerate(comp):
+            if count:
+                p = count / n
+                sub = self._stand_vector(remove_card(comp, i), upcard, best_total(hard + i + 1, has_ace or i == ACE))
+                for k in range(6):
+                    vec[k] += p * sub[k]
+        vec[0] *= 2
+        vec[5] = 1.0
+        return tuple(vec)
+
+    def decision_vectors(self, comp, upcard, hand):
+        """Outcome vectors for every legal action on a hand of rank indexes"""
+        hard, has_ace = hand_state(hand)
+        hit, best = self._hit_vectors(comp, upcard, hard, has_ace)
+        vectors = {"stand": self._stand_vector(comp, upcard, best_total(hard, has_ace)), "hit": hit}
+        if self.rules.can_double(hard, has_ace, len(hand)) and hard <= 21:
+            vectors["double"] = self._double_vector(comp, upcard, hard, has_ace)
+        return vectors
+
+    def decision_evs(self, comp, upcard, hand):
+        """Expected value per unit bet of stand, hit and (when legal) double"""
+        return {action: vec[0] for action, vec in self.decision_vectors(comp, upcard, hand).items()}
+
+    def bust_probability(self, comp, hand):
+        """Chance the next card busts the hand"""
+        hard, _ = hand_state(hand)
+        n = sum(comp)
+        return sum(count for i, count in enumerate(comp) if hard + i + 1 > 21) / n
+
+    def insurance_ev(self, comp):
+        """Expected value per unit of insurance against a dealer Ace (pays 2:1)"""
+        p = self.dealer_blackjack_probability(comp, ACE)
+        return 2 * p - (1 - p)
+
+
+def analyze(rules=None, calculator=None):
+    """Walk every starting deal and return the house edge and outcome probabilities"""
+    rules = rules or HouseRules()
+    calc = calculator or EVCalculator(rules)
+    shoe = full_shoe(rules.decks)
+    total_cards = sum(shoe)
+    player_ev = 0.0
+    insurance_gain = 0.0
+    outcomes = dict.fromkeys(["blackjack", "win", "push", "loss", "bust", "dealer_blackjack", "double", "insurance_taken"], 0.0)
+    dealer_totals = [0.0] * 6
+    # Chance of a deal with no natural on either side, where the dealer really plays out
+    dealer_plays = 0.0
+    # Net result of a hand in units of the bet -> probability (insurance left out)
+    payoffs = {}
+
+    def pay(multiple, p):
+        key = payoff_key(multiple)
+        payoffs[key] = payoffs.get(key, 0.0) + p
+
+    for up in range(10):
+        p_up = shoe[up] / total_cards
+        after_up = remove_card(shoe, up)
+        for a in range(10):
+            p_a = after_up[a] / (total_cards - 1)
+            if not p_a:
+                continue
+            after_a = remove_card(after_up, a)
+            for b in range(10):
+                p_b = after_a[b] / (total_cards - 2)
+                if not p_b:
+                    continue
+                comp = remove_card(after_a, b)
+                p = p_up * p_a * p_b
+                p_dbj = calc.dealer_blackjack_probability(comp, up)
+                player_bj = {a, b} == {ACE, TEN}
+
+                if up == ACE and rules.insurance and not player_bj:
+                    ins = calc.insurance_ev(comp)
+                    # Insurance costs half the bet; a perfect player only takes it when it is favourable
+                    if ins > 0:
+                        insurance_gain += p * 0.5 * ins
+                        outcomes["insurance_taken"] += p
+
+                if player_bj:
+                    player_ev += p * (1 - p_dbj) * rules.blackjack_payout
+                    outcomes["blackjack"] += p * (1 - p_dbj)
+                    outcomes["push"] += p * p_dbj
+                    outcomes["dealer_blackjack"] += p * p_dbj
+                    pay(rules.blackjack_payout, p * (1 - p_dbj))
+                    pay(0, p * p_dbj)
+                    continue
+
+                vectors = calc.decision_vectors(comp, up, [a, b])
+                best = max(vectors.values(), key=lambda v: v[0])
+                p_play = p * (1 - p_dbj)
+                player_ev += p_play * best[0] - p * p_dbj
+                outcomes["win"] += p_play * best[1]
+                outcomes["push"] += p_play * best[2]
+                outcomes["loss"] += p_play * best[3] + p * p_dbj
+                outcomes["bust"] += p_play * best[4]
+                outcomes["double"] += p_play * best[5]
+                outcomes["dealer_blackjack"] += p * p_dbj
+                stake = 2 if best[5] else 1
+                pay(stake, p_play * best[1])
+                pay(0, p_play * best[2])
+                pay(-stake, p_play * best[3])
+                pay(-1, p * p_dbj)
+                dist = calc.dealer_distribution(comp, up)
+                dealer_plays += p_play
+                for k in range(6):
+                    dealer_totals[k] += p_play * dist[k]
+        # Memo entries never cross upcards, so drop them to keep memory flat
+        calc.clear()
+
+    player_ev += insurance_gain
+    return {
+        "rules": rules.to_dict(),
+        "house_edge": -player_ev,
+        "player_ev": player_ev,
+        "insurance_ev": insurance_gain,
+        "outcomes": outcomes,
+        # Conditional on no natural for player or dealer, so these add up to 1
+        "dealer_totals": {name: p / dealer_plays for name, p in zip(DEALER_TOTALS, dealer_totals)},
+        "payoffs": payoffs,
+    }
+
+
+def fixed_policy_payoffs(rules=None, stand_on=16):
+    """Per-hand payoffs for a player who hits below stand_on and never doubles or insures.
+
+    stand_on=16 is AIPlayer.decide_hit. Returns the same {payoff_key: probability} mapping
+    as the "payoffs" entry of analyze().
+    """
+    rules = rules or HouseRules()
+    calc = EVCalculator(rules)
+    shoe = full_shoe(rules.decks)
+    total_cards = sum(shoe)
+    payoffs = {}
+    memo = {}
+
+    def play(comp, up, hard, has_ace):
+        # (win, push, loss) for the rest of the hand
+        key = (comp, up, hard, has_ace)
+        result = memo.get(key)
+        if result is None:
+            total = best_total(hard, has_ace)
+            if total >= stand_on or hard > 21:
+                result = calc._stand_vector(comp, up, total)[1:4]
+            else:
+                n = sum(comp)
+                result = [0.0, 0.0, 0.0]
+                for i, count in enumerate(comp):
+                    if count:
+                        sub = play(remove_card(comp, i), up, hard + i + 1, has_ace or i == ACE)
+                        for k in range(3):
+                            result[k] += count / n * sub[k]
+            memo[key] = result
+        return result
+
+    def pay(multiple, p):
+        key = payoff_key(multiple)
+        payoffs[key] = payoffs.get(key, 0.0) + p
+
+    for up in range(10):
+        p_up = shoe[up] / total_cards
+        after_up = remove_card(shoe, up)
+        for a in range(10):
+            after_a = remove_card(after_up, a) if after_up[a] else None
+            for b in range(10):
+                if after_a is None or not after_a[b]:
+                    continue
+                p = p_up * after_up[a] / (total_cards - 1) * after_a[b] / (total_cards - 2)
+                comp = remove_card(after_a, b)
+                p_dbj = calc.dealer_blackjack_probability(comp, up)
+                if {a, b} == {ACE, TEN}:
+                    pay(rules.blackjack_payout, p * (1 - p_dbj))
+                    pay(0, p * p_dbj)
+                    continue
+                win, push, loss = play(comp, up, *hand_state([a, b]))
+                p_play = p * (1 - p_dbj)
+                pay(1, p_play * win)
+                pay(0, p_play * push)
+                pay(-1, p_play * loss + p * p_dbj)
+        calc.clear()
+        memo.clear()
+    return payoffs
+
+
+class HouseEdgeCache:
+    """Stores analysis reports on disk, one JSON file per rules hash (and kind of report)"""
+
+    def __init__(self, cache_dir="house_edge_cache"):
+        self.cache_dir = cache_dir
+
+    def path_for(self, rules, kind=None):
+        suffix = f"-{kind}" if kind else ""
+        return os.path.join(self.cache_dir, f"{rules.cache_key()}{suffix}.json")
+
+    def get(self, rules, kind=None):
+        """The cached report, or None if there is none or it can't be used"""
+        path = self.path_for(rules, kind)
+        try:
+            with open(path, "r") as f:
+                report = json.load(f)
+            if not isinstance(report, dict):
+                raise ValueError("not a JSON object")
+            # A full analysis names the rules it was made for; anything else is stale or foreign
+            if kind is None and report["rules"] != rules.to_dict():
+                raise ValueError("made for different rules")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring house edge cache {path}: {e!r}", file=sys.stderr)
+            return None
+        return report
+
+    def put(self, rules, report, kind=None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path_for(rules, kind)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+def house_edge(rules=None, cache=None):
+    """Return the analysis report for a rule set, computing it only on a cache miss"""
+    rules = rules or HouseRules()
+    cache = cache if cache is not None else HouseEdgeCache()
+    report = cache.get(rules)
+    if report is None:
+        report = analyze(rules)
+        cache.put(rules, report)
+    return report
+
+
+def format_report(report):
+    rules = report["rules"]
+    lines = [
+        f"Decks: {rules['decks']}  Dealer {'hits' if rules['dealer_hits_soft_17'] else 'stands on'} soft 17  "
+        f"Blackjack pays {rules['blackjack_payout']:g}:1  Double: {rules['double_on']}  "
+        f"Insurance: {'yes' if rules['insurance'] else 'no'}",
+        f"House edge: {report['house_edge'] * 100:.4f}%",
+        "Outcomes:",
+    ]
+    for name, p in report["outcomes"].items():
+        lines.append(f"  {name:<17}{p * 100:8.4f}%")
+    lines.append("Dealer final totals (when neither side has a natural):")
+    for name, p in report["dealer_totals"].items():
+        lines.append(f"  {name:<17}{p * 100:8.4f}%")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exact house edge for BlackJack Palace rule variants")
+    parser.add_argument("--decks", type=int, default=1)
+    parser.add_argument("--h17", action="store_true", help="dealer hits soft 17")
+    parser.add_argument("--payout", type=float, default=1.5, help="blackjack payout per unit bet (1.5 is 3:2)")
+    parser.add_argument("--double", choices=list(DOUBLE_RULES), default="any", help="which two-card hands may double")
+    parser.add_argument("--no-insurance", action="store_true")
+    parser.add_argument("--cache-dir", default="house_edge_cache")
+    parser.add_argument("--json", action="store_true", help="print the raw report as JSON")
+    args = parser.parse_args(argv)
+    rules = HouseRules(args.decks, args.h17, args.payout, args.double, not args.no_insurance)
+    report = house_edge(rules, HouseEdgeCache(args.cache_dir))
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+import argparse
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from achievements import ACHIEVEMENTS
+from leaderboard_store import LeaderboardStore, write_player_records
+
+'''
+Synthetic leaderboards and scaling benchmarks for BlackJack Palace's stats storage.
+generate writes a realistic player base of any size (unique names, heavy-tailed wins,
+badges earned in a plausible order with matching achievements) one record at a time.
+bench generates one leaderboard per size and, for each one in a fresh process, times what
+the game does with it: the first load, a full save, building the ranking screen's indexes
+and first page, and one round's get_or_create_player + update for a two-seat table. It
+reports the process's peak memory and the growth exponent of every measure between sizes
+(1.0 means linear in the number of players).
+Run with: python3 leaderboard_bench.py bench --sizes 10000 100000 1000000 [--format jsonl]
+          python3 leaderboard_bench.py generate big.json --players 1000000
+'''
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+GENERATE_CHUNK = 100000
+# Same page size as the achievements leaderboard screen (LEADERBOARD_VISIBLE_ROWS)
+VISIBLE_ROWS = 8
+FIRST_NAMES = [
+    "Serena", "Blair", "Dan", "Jenny", "Nate", "Vanessa", "Chuck", "Lily", "Rufus", "Eric",
+    "Georgina", "Dorota", "Ivy", "Olivia", "Aria", "Maya", "Zoe", "Chloe", "Nora", "Luna",
+    "Leo", "Max", "Ella", "Sofia", "Mila", "Ava", "Noah", "Liam", "Emma", "Isla",
+]
+# Badges in roughly the order players earn them, with the chance a player earns each per win
+BADGE_ODDS = [
+    ("ice_cream", 0.12),
+    ("heart_gem", 0.05),
+    ("cherry_blossom", 0.03),
+    ("unicorn", 0.04),
+    ("flamingo", 0.06),
+    ("ballet_slipper", 0.015),
+]
+# Share of players who played against the AI (teddy_bear and butterfly are only earned there)
+AI_PLAYERS = 0.4
+BOW_MASTER_SET = {"ice_cream", "pink_lotus", "flamingo", "ballet_slipper", "cherry_blossom", "heart_gem", "unicorn"}
+MEASURES = ["load", "save", "ranking_screen", "round_update"]
+
+
+def synthetic_name(i):
+    first = FIRST_NAMES[i % len(FIRST_NAMES)]
+    return first if i < len(FIRST_NAMES) else f"{first}{i // len(FIRST_NAMES)}"
+
+
+def synthetic_records(players, seed=0, started=1690000000):
+    """Yield (name, record) for a synthetic player base, a chunk of players at a time"""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    badge_ids = [badge_id for badge_id, _ in BADGE_ODDS]
+    odds = np.array([p for _, p in BADGE_ODDS])
+    now = int(time.time())
+    for start in range(0, players, GENERATE_CHUNK):
+        count = min(GENERATE_CHUNK, players - start)
+        # Most players win a handful of rounds; a few regulars win hundreds
+        wins = np.minimum(np.floor(rng.lognormal(1.0, 1.4, count)), 5000).astype(np.int64)
+        earned = rng.random((count, len(odds))) < 1.0 - (1.0 - odds) ** wins[:, None]
+        vs_ai = rng.random(count) < AI_PLAYERS
+        butterfly = vs_ai & (rng.random(count) < 1.0 - 0.95 ** wins)
+        times = rng.integers(started, now, (count, 2))
+        for j in range(count):
+            player_wins = int(wins[j])
+            earned_ids = [badge_ids[k] for k in np.flatnonzero(earned[j])]
+            if player_wins >= 5:
+                earned_ids.insert(1, "pink_lotus")
+            if vs_ai[j] and player_wins >= 3:
+                earned_ids.append("teddy_bear")
+            if butterfly[j]:
+                earned_ids.append("butterfly")
+            if BOW_MASTER_SET.issubset(earned_ids):
+                earned_ids.append("bow_master")
+            first, last = sorted(times[j].tolist())
+            step = (last - first) // max(1, len(earned_ids))
+            achievements = {}
+            for k, achievement_id in enumerate(earned_ids):
+                # Hitting 21 keeps happening; the other badges are one-offs in practice
+                repeats = 1 + player_wins // 20 if achievement_id == "ice_cream" else 1
+                achievements[achievement_id] = [first + k * step, repeats]
+            yield synthetic_name(start + j), {
+                "wins": player_wins,
+                "badges": [ACHIEVEMENTS[achievement_id][0] for achievement_id in earned_ids],
+                "achievements": achievements,
+            }
+
+
+def generate(path, players, seed=0):
+    write_player_records(path, synthetic_records(players, seed))
+
+
+def _peak_memory_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def _timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def measure(path):
+    """Seconds for each MEASURE on one leaderboard file, plus peak memory; runs in its own process"""
+    store = LeaderboardStore(path)
+    results = {}
+    results["load"], stats = _timed(lambda: store.stats)
+    results["players"] = len(stats)
+
+    def ranking_screen():
+        rows = []
+        for by in ("wins", "badges"):
+            index = store.ranking(by)
+            rows.extend(f"{i}. {name} - {record['wins']} wins  {' '.join(record['badges'])}"
+                        for i, name, record in index.page(0, VISIBLE_ROWS))
+        return rows
+    results["ranking_screen"], _ = _timed(ranking_screen)
+
+    def round_update():
+        # A returning player and a new one sit down, win, and are saved like settlement does
+        for name in (synthetic_name(len(stats) // 2), f"Newcomer{len(stats)}"):
+            record = store.get_record(name)
+            store.update_player(name, record["wins"] + 1, list(record["badges"]), dict(record["achievements"]), save=False)
+    results["round_update"], _ = _timed(round_update)
+    # Save to a scratch file beside it, so a leaderboard kept with --dir is the same on every run
+    root, extension = os.path.splitext(path)
+    store.path = f"{root}-saved{extension}"
+    try:
+        results["save"], _ = _timed(store.save_player_stats)
+    finally:
+        if os.path.exists(store.path):
+            os.remove(store.path)
+    results["file_mb"] = os.path.getsize(path) / (1 << 20)
+    results["peak_mb"] = _peak_memory_mb()
+    return results
+
+
+def growth(results, measure_name):
+    """Exponent k in time ~ players^k between each pair of consecutive sizes"""
+    exponents = []
+    for before, after in zip(results, results[1:]):
+        if before[measure_name] > 0 and after[measure_name] > 0:
+            exponents.append(math.log(after[measure_name] / before[measure_name]) / math.log(after["players"] / before["players"]))
+        else:
+            exponents.append(None)
+    return exponents
+
+
+def bench(sizes, directory, extension=".json", seed=0):
+    from concurrent.futures import ProcessPoolExecutor
+    results = []
+    for size in sorted(sizes):
+        path = os.path.join(directory, f"synthetic-{size}-{seed}{extension}")
+        if not os.path.exists(path):
+            generate(path, size, seed)
+        # A fresh process per size so peak memory and caches belong to that size alone
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            results.append(pool.submit(measure, path).result())
+    return results
+
+
+def format_results(results):
+    lines = [f"{'players':>10}{'file MB':>9}{'load s':>9}{'save s':>9}{'ranking s':>11}{'round ms':>10}{'peak MB':>9}"]
+    for r in results:
+        peak = f"{r['peak_mb']:9.0f}" if r["peak_mb"] is not None else f"{'?':>9}"
+        lines.append(f"{r['players']:>10}{r['file_mb']:9.1f}{r['load']:9.3f}{r['save']:9.3f}"
+                     f"{r['ranking_screen']:11.3f}{r['round_update'] * 1000:10.2f}{peak}")
+    if len(results) > 1:
+        lines.append("Growth exponents between sizes (1.0 = linear in players):")
+        for name in MEASURES + ["peak_mb"]:
+            if name == "peak_mb" and results[0]["peak_mb"] is None:
+                continue
+            exponents = ' '.join(f"{k:5.2f}" if k is not None else "    -" for k in growth(results, name))
+            lines.append(f"  {name:<15}{exponents}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetic leaderboards and scaling benchmarks for BlackJack Palace")
+    commands = parser.add_subparsers(dest="command", required=True)
+    make = commands.add_parser("generate", help="write a synthetic leaderboard (.json or .jsonl by extension)")
+    make.add_argument("path")
+    make.add_argument("--players", type=int, default=100000)
+    make.add_argument("--seed", type=int, default=0)
+    run = commands.add_parser("bench", help="time loading, saving and ranking at several sizes")
+    run.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    run.add_argument("--format", choices=["json", "jsonl"], default="json")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--dir", help="keep generated leaderboards here for later runs (default: a temporary directory)")
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        generate(args.path, args.players, args.seed)
+        return
+    directory = args.dir or tempfile.mkdtemp(prefix="palace-bench-")
+    os.makedirs(directory, exist_ok=True)
+    try:
+        print(format_results(bench(args.sizes, directory, "." + args.format, args.seed)))
+    finally:
+        if not args.dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
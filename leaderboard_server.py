@@ -0,0 +1,234 @@
+import argparse
+import hashlib
+import heapq
+import json
+import os
+import sys
+import threading
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from achievements import ACHIEVEMENTS
+from leaderboard_store import LeaderboardStore, DEFAULT_LEADERBOARD_FILE
+
+'''
+Read-only HTTP/JSON leaderboard service for lobby displays and companion apps.
+  GET /rankings/wins?offset=0&limit=50     players by wins (same order as the Tk screen)
+  GET /rankings/badges?offset=0&limit=50   players by badge count
+  GET /players/<name>                      one player's stats, ranks and achievements
+  GET /achievements/recent?limit=20        newest first-time achievements across all players
+Each response body is built once per change to the stats and then served from cache with
+an ETag, so clients polling with If-None-Match get an empty 304 until a round is settled.
+Stats and rankings are loaded on the first request, not when the server starts, and are
+read under the store's lock so the game can't change them halfway through a response.
+Start it with the game via --serve-leaderboard [PORT] or PALACE_LEADERBOARD_PORT, or serve a
+leaderboard file on its own with: python3 leaderboard_server.py --file leaderboard.json
+'''
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_PAGE = 50
+MAX_PAGE = 500
+RECENT_ACHIEVEMENTS = 100
+# Distinct request URLs cached per version of the stats
+MAX_CACHED = 1024
+RANKED_BY = ("wins", "badges")
+
+
+class LeaderboardFeed:
+    """Cached JSON views of a LeaderboardStore, rebuilt only after players change"""
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._version = 0
+        self._cache = {}
+        self._dirty = set()
+        self._recent = None
+        store.listeners.append(self.player_changed)
+
+    def ranking(self, by):
+        return self.store.ranking(by)
+
+    def player_changed(self, name):
+        # Called by the store with its lock held, right after the rankings changed
+        with self._lock:
+            self._version += 1
+            self._cache = {}
+            self._dirty.add(name)
+
+    def response(self, path, query):
+        """(status, body bytes, etag) for a request, from cache when the stats haven't changed"""
+        key = (path, query)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        # The store's lock keeps the game from changing stats, rankings or badges while they're read;
+        # payloads hold copies of the badge lists, so encoding them below needs no lock
+        with self.store.lock:
+            version = self._version
+            status, payload = self._build(path, parse_qs(query))
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode("utf-8")
+        result = (status, body, '"' + hashlib.sha1(body).hexdigest() + '"')
+        with self._lock:
+            # Only keep it if no player changed since it was built
+            if version == self._version:
+                if len(self._cache) >= MAX_CACHED:
+                    self._cache = {}
+                self._cache[key] = result
+        return result
+
+    def _build(self, path, params):
+        if path.startswith("/players/") and len(path) > len("/players/"):
+            # Everything after the prefix is the name, so names containing '/' (raw or %2F) work
+            profile = self._profile(unquote(path[len("/players/"):]))
+            return (200, profile) if profile else (404, {"error": "unknown player"})
+        parts = [part for part in path.split("/") if part]
+        if len(parts) == 2 and parts[0] == "rankings" and parts[1] in RANKED_BY:
+            return 200, self._ranking_page(parts[1], params)
+        if parts == ["achievements", "recent"]:
+            limit = _int_param(params, "limit", 20, RECENT_ACHIEVEMENTS)
+            return 200, {"achievements": self._recent_achievements()[:limit]}
+        return 404, {"error": "not found"}
+
+    def _ranking_page(self, by, params):
+        index = self.ranking(by)
+        offset = _int_param(params, "offset", 0, len(index))
+        limit = _int_param(params, "limit", DEFAULT_PAGE, MAX_PAGE)
+        players = [
+            {"rank": rank, "name": name, "wins": record["wins"], "badges": list(record["badges"])}
+            for rank, name, record in index.page(offset, limit)
+        ]
+        return {"by": by, "total": len(index), "offset": offset, "players": players}
+
+    def _profile(self, name):
+        record = self.store.stats.get(name)
+        if record is None:
+            return None
+        return {
+            "name": name,
+            "wins": record["wins"],
+            "badges": list(record["badges"]),
+            "rank_by_wins": self.ranking("wins").rank(name),
+            "rank_by_badges": self.ranking("badges").rank(name),
+            "achievements": [_achievement(name, achievement_id, entry)
+                             for achievement_id, entry in record["achievements"].items()],
+        }
+
+    def _recent_achievements(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        stats = self.store.stats
+        if self._recent is None:
+            # One full scan; afterwards only players who changed are looked at again
+            names = stats.keys()
+            recent = []
+        else:
+            names = dirty
+            recent = [item for item in self._recent if item["player"] not in dirty]
+        for name in list(names):
+            record = stats.get(name)
+            if record is None:
+                continue
+            for achievement_id, entry in record["achievements"].items():
+                if entry[0] is not None:
+                    recent.append(_achievement(name, achievement_id, entry))
+        self._recent = heapq.nlargest(RECENT_ACHIEVEMENTS, recent, key=lambda item: item["earned"])
+        return self._recent
+
+
+def _achievement(player, achievement_id, entry):
+    badge, name, reason = ACHIEVEMENTS.get(achievement_id, ("", achievement_id, ""))
+    return {"player": player, "id": achievement_id, "badge": badge, "name": name, "reason": reason,
+            "earned": entry[0], "count": entry[1]}
+
+
+def _int_param(params, name, default, upper):
+    try:
+        value = int(params[name][0])
+    except (KeyError, ValueError):
+        return default
+    return max(0, min(value, upper))
+
+
+def _handler_class(feed):
+    # http.server is only imported once a server is actually started
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            status, body, etag = feed.response(url.path, url.query)
+            if status == 200 and etag in self.headers.get("If-None-Match", ""):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            # Clients may keep the body but must check the ETag before reusing it
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class LeaderboardServer:
+    def __init__(self, store, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        from http.server import ThreadingHTTPServer
+        self.feed = LeaderboardFeed(store)
+        self.httpd = ThreadingHTTPServer((host, port), _handler_class(self.feed))
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self):
+        return self.httpd.server_address
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="leaderboard-http", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread:
+            self.httpd.shutdown()
+            self._thread.join()
+        self.httpd.server_close()
+
+
+def from_environment(store, argv=None):
+    """Start a LeaderboardServer if --serve-leaderboard [PORT] or PALACE_LEADERBOARD_PORT asks for one"""
+    argv = sys.argv[1:] if argv is None else argv
+    port = os.environ.get("PALACE_LEADERBOARD_PORT")
+    if "--serve-leaderboard" in argv:
+        index = argv.index("--serve-leaderboard")
+        port = argv[index + 1] if index + 1 < len(argv) and argv[index + 1].isdigit() else DEFAULT_PORT
+    if not port:
+        return None
+    return LeaderboardServer(store, port=int(port)).start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a BlackJack Palace leaderboard as read-only JSON")
+    parser.add_argument("--file", default=DEFAULT_LEADERBOARD_FILE)
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+    server = LeaderboardServer(LeaderboardStore(args.file), args.host, args.port)
+    print(f"Serving {args.file} on http://{args.host}:{server.address[1]}/rankings/wins")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,417 @@
+import argparse
+import bisect
+import heapq
+import json
+import os
+import stat
+import tempfile
+import threading
+
+from achievements import merge_achievements, migrate_achievements
+from name_index import NameIndex
+
+'''
+Persistent player stats (wins, badges and achievements) for BlackJack Palace.
+The file is only read the first time something asks for the stats, so screens that never
+touch the leaderboard (and headless tools) don't pay for loading it.
+
+Two on-disk formats are supported, chosen by file extension:
+  leaderboard.json   one JSON object keyed by player name (the original format)
+  leaderboard.jsonl  one compact {"name": ..., ...} record per line
+Both are read and written one player record at a time, so converting or merging
+very large leaderboards never holds a whole file in memory.
+Rankings (by wins, by badges) are kept sorted as players are updated and read a page
+at a time, so the leaderboard screens never sort or draw the whole player base.
+Player names are also kept in a NameIndex for start-screen autocomplete.
+With start_background_writer() saves happen on a StatsWriter thread (see stats_writer.py).
+Run with: python3 leaderboard_store.py export leaderboard.json leaderboard.jsonl
+          python3 leaderboard_store.py merge merged.json kiosk1.json kiosk2.jsonl
+'''
+
+DEFAULT_LEADERBOARD_FILE = "leaderboard.json"
+LINE_FORMAT_EXTENSIONS = ('.jsonl', '.ndjson')
+READ_CHUNK_SIZE = 1 << 16
+MERGE_RUN_SIZE = 50000
+
+# Read once at import: os.umask can only be read by setting it, which isn't safe once writer threads run
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\r\n'
+
+# Ranking orders for the leaderboard screens: the score of a record, highest first
+RANKINGS = {
+    "wins": lambda record: record["wins"],
+    "badges": lambda record: len(record["badges"]),
+}
+
+
+def new_player_record():
+    return {"wins": 0, "badges": [], "achievements": {}}
+
+
+def normalize_record(record):
+    # Migrate old formats if needed: bare win counts, then achievement sentences
+    if isinstance(record, int):
+        return {"wins": max(0, record), "badges": [], "achievements": {}}
+    record["achievements"] = migrate_achievements(record.get("achievements", {}))
+    return record
+
+
+def is_line_format(path):
+    return path.lower().endswith(LINE_FORMAT_EXTENSIONS)
+
+
+class _ChunkReader:
+    """Feeds a text file to the JSON decoder a chunk at a time"""
+
+    def __init__(self, f, chunk_size=READ_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.more():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in leaderboard at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.more():
+                    continue
+                raise
+            # A value that ends exactly at the buffer edge (e.g. a number) may continue in the next chunk
+            if end == len(self.buf) and not self.eof and self.more():
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_json_object(f):
+    reader = _ChunkReader(f)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        name = reader.value()
+        reader.expect(':')
+        yield name, normalize_record(reader.value())
+        separator = reader.peek()
+        reader.pos += 1
+        if separator == '}':
+            return
+        if separator != ',':
+            raise ValueError(f"Expected ',' or '}}' in leaderboard at offset {reader.pos - 1}")
+
+
+def _iter_json_lines(f):
+    for line in f:
+        line = line.strip()
+        if line:
+            record = json.loads(line)
+            yield record.pop("name"), normalize_record(record)
+
+
+def iter_player_records(path):
+    """Yield (name, record) pairs from a leaderboard file without loading all of it"""
+    with open(path, "r", encoding="utf-8") as f:
+        records = _iter_json_lines(f) if is_line_format(path) else _iter_json_object(f)
+        for item in records:
+            yield item
+
+
+def _write_json_object(f, records):
+    # Same layout json.dump(..., indent=2) produces, one record at a time
+    f.write("{")
+    first = True
+    for name, record in records:
+        f.write("\n  " if first else ",\n  ")
+        f.write(json.dumps(name) + ": " + json.dumps(record, indent=2).replace("\n", "\n  "))
+        first = False
+    f.write("}" if first else "\n}")
+
+
+def _write_json_lines(f, records):
+    for name, record in records:
+        line = {"name": name}
+        line.update(record)
+        f.write(json.dumps(line, ensure_ascii=False, separators=(',', ':')))
+        f.write("\n")
+
+
+def _file_mode(path):
+    """Permissions for a rewritten file: the existing file's, else the usual umask default"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def write_player_records(path, records):
+    """Stream (name, record) pairs to a leaderboard file, replacing it atomically"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".leaderboard-", suffix=".tmp")
+    try:
+        # mkstemp files are owner-only; keep the leaderboard as readable as it was
+        os.chmod(tmp_path, _file_mode(path))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            if is_line_format(path):
+                _write_json_lines(f, records)
+            else:
+                _write_json_object(f, records)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _combine_records(records, wins_mode):
+    """Fold records for the same player (from different machines) into one"""
+    merged = new_player_record()
+    for record in records:
+        if wins_mode == "max":
+            merged["wins"] = max(merged["wins"], record["wins"])
+        else:
+            merged["wins"] += record["wins"]
+        for badge in record["badges"]:
+            if badge not in merged["badges"]:
+                merged["badges"].append(badge)
+        merge_achievements(merged["achievements"], record["achievements"], counts=wins_mode)
+    return merged
+
+
+def merge_leaderboards(paths, out_path, wins_mode="sum", run_size=MERGE_RUN_SIZE):
+    """Merge several leaderboards into out_path with an external sort by player name.
+
+    Inputs are split into sorted runs of at most run_size players in a temporary
+    directory and then k-way merged, so memory stays bounded by run_size no matter
+    how many or how large the inputs are. wins_mode is "sum" for independent
+    machines or "max" when the inputs started from a shared copy.
+    """
+    with tempfile.TemporaryDirectory(prefix="leaderboard-merge-") as tmp_dir:
+        runs = []
+
+        def write_run(chunk):
+            chunk.sort(key=lambda item: item[0])
+            run_path = os.path.join(tmp_dir, f"run{len(runs)}.jsonl")
+            with open(run_path, "w", encoding="utf-8") as f:
+                _write_json_lines(f, chunk)
+            runs.append(run_path)
+
+        for path in paths:
+            chunk = []
+            for item in iter_player_records(path):
+                chunk.append(item)
+                if len(chunk) >= run_size:
+                    write_run(chunk)
+                    chunk = []
+            if chunk:
+                write_run(chunk)
+
+        def merged_records():
+            streams = [iter_player_records(run_path) for run_path in runs]
+            group_name, group = None, []
+            for name, record in heapq.merge(*streams, key=lambda item: item[0]):
+                if group and name != group_name:
+                    yield group_name, _combine_records(group, wins_mode)
+                    group = []
+                group_name = name
+                group.append(record)
+            if group:
+                yield group_name, _combine_records(group, wins_mode)
+
+        write_player_records(out_path, merged_records())
+
+
+class RankingIndex:
+    """Players ordered by one score, highest first, ties in leaderboard order.
+
+    Sorted once when first asked for and then kept in order as players change, so a page
+    of the ranking is a slice of the index instead of a sort of every player.
+    """
+
+    def __init__(self, stats, score):
+        self.stats = stats
+        self.score = score
+        self.entries = {}
+        for seq, (name, record) in enumerate(stats.items()):
+            self.entries[name] = (-score(record), seq, name)
+        self.keys = sorted(self.entries.values())
+
+    def __len__(self):
+        return len(self.keys)
+
+    def page(self, offset, limit):
+        """(rank, name, record) for the players ranked offset+1 .. offset+limit"""
+        stats = self.stats
+        return [(offset + i, name, stats[name]) for i, (_, _, name) in enumerate(self.keys[offset:offset + limit], 1)]
+
+    def rank(self, name):
+        """1-based position of a player, or None for an unknown name"""
+        key = self.entries.get(name)
+        return None if key is None else bisect.bisect_left(self.keys, key) + 1
+
+    def update(self, name):
+        # Records are shared with Player objects and may already be changed in place,
+        # so the old position comes from the stored key rather than the record
+        old_key = self.entries.get(name)
+        if old_key is None:
+            seq = len(self.entries)
+        else:
+            seq = old_key[1]
+            del self.keys[bisect.bisect_left(self.keys, old_key)]
+        key = (-self.score(self.stats[name]), seq, name)
+        self.entries[name] = key
+        bisect.insort(self.keys, key)
+
+
+class LeaderboardStore:
+    def __init__(self, path=DEFAULT_LEADERBOARD_FILE):
+        self.path = path
+        self._stats = None
+        self._rankings = {}
+        self._names = None
+        self.writer = None
+        # Called with a player's name after their record is created or updated (with lock held)
+        self.listeners = []
+        # Held while stats, rankings or the badge lists and achievement dicts inside records change,
+        # and by other threads (leaderboard_server) reading them
+        self.lock = threading.RLock()
+
+    @property
+    def loaded(self):
+        return self._stats is not None
+
+    @property
+    def stats(self):
+        """Player stats keyed by name, loaded from disk on first access"""
+        if self._stats is None:
+            with self.lock:
+                if self._stats is None:
+                    self._stats = self.load_player_stats()
+        return self._stats
+
+    def load_player_stats(self):
+        try:
+            return dict(iter_player_records(self.path))
+        except Exception:
+            return {}
+
+    def start_background_writer(self, **kwargs):
+        """Move file writes to a StatsWriter thread; saving then only queues changed players"""
+        from stats_writer import StatsWriter
+        self.writer = StatsWriter(self.path, **kwargs).start()
+        return self.writer
+
+    def close(self):
+        """Flush and stop the background writer, if there is one"""
+        if self.writer:
+            self.writer.close()
+
+    def save_player_stats(self):
+        if self.writer:
+            self.writer.commit()
+        else:
+            write_player_records(self.path, self.stats.items())
+
+    @property
+    def names(self):
+        """NameIndex of every player, built from the stats on first use"""
+        if self._names is None:
+            self._names = NameIndex(self.stats)
+        return self._names
+
+    def ranking(self, by):
+        """The RankingIndex for "wins" or "badges", built on first use"""
+        index = self._rankings.get(by)
+        if index is None:
+            with self.lock:
+                index = self._rankings.get(by)
+                if index is None:
+                    index = RankingIndex(self.stats, RANKINGS[by])
+                    self._rankings[by] = index
+        return index
+
+    def ranked_page(self, by, offset, limit):
+        return self.ranking(by).page(offset, limit)
+
+    def _changed(self, name, created=False):
+        # Callers hold self.lock, so readers never see a ranking mid-update or a stale version
+        if created and self._names is not None:
+            self._names.insert(name)
+        for index in self._rankings.values():
+            index.update(name)
+        for listener in self.listeners:
+            listener(name)
+
+    def get_record(self, name):
+        """Return the stats record for a name, creating an empty one if needed"""
+        stats = self.stats
+        if name not in stats:
+            with self.lock:
+                stats[name] = new_player_record()
+                self._changed(name, created=True)
+        return stats[name]
+
+    def update_player(self, name, wins, badges, achievements, save=True):
+        stats = self.stats
+        with self.lock:
+            created = name not in stats
+            stats[name] = {
+                "wins": wins,
+                "badges": badges,
+                "achievements": achievements
+            }
+            self._changed(name, created)
+        if self.writer:
+            self.writer.update(name, self.stats[name], commit=save)
+        # Callers updating several players pass save=False and save once at the end
+        elif save:
+            self.save_player_stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert and merge BlackJack Palace leaderboards")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="rewrite a leaderboard, converting format by file extension")
+    export.add_argument("source")
+    export.add_argument("dest")
+    merge = commands.add_parser("merge", help="combine leaderboards from several machines")
+    merge.add_argument("dest")
+    merge.add_argument("sources", nargs="+")
+    merge.add_argument("--wins", choices=["sum", "max"], default="sum")
+    merge.add_argument("--run-size", type=int, default=MERGE_RUN_SIZE)
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        write_player_records(args.dest, iter_player_records(args.source))
+    else:
+        merge_leaderboards(args.sources, args.dest, args.wins, args.run_size)
+
+
+if __name__ == '__main__':
+    main()
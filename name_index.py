@@ -0,0 +1,88 @@
+import bisect
+import difflib
+
+'''
+Prefix search over player names for BlackJack Palace's start screen.
+Names are kept in one case-insensitively sorted list, so completing a prefix is a binary
+search plus a short slice, and a new player is a single insort. Fuzzy "did you mean"
+suggestions compare the typed name against names that share a leading part of it, and
+only if none of those is close (a typo in the first letter) against names of about the
+same length, up to FALLBACK_POOL of them; never against the whole leaderboard. That can
+take tens of milliseconds on a big leaderboard, so the game only asks when Start is pressed.
+'''
+
+# Most names compared when looking for fuzzy suggestions
+SUGGESTION_POOL = 200
+# Most same-length names compared when no name sharing a prefix is close enough
+FALLBACK_POOL = 20000
+
+
+class NameIndex:
+    def __init__(self, names=()):
+        self.keys = sorted((name.casefold(), name) for name in names)
+        self.by_length = {}
+        for key in self.keys:
+            self.by_length.setdefault(len(key[0]), []).append(key)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def insert(self, name):
+        key = (name.casefold(), name)
+        i = bisect.bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            self.keys.insert(i, key)
+            self.by_length.setdefault(len(key[0]), []).append(key)
+
+    def _with_prefix(self, folded, limit):
+        start = bisect.bisect_left(self.keys, (folded,))
+        matches = []
+        for key, name in self.keys[start:start + limit]:
+            if not key.startswith(folded):
+                break
+            matches.append((key, name))
+        return matches
+
+    def complete(self, prefix, limit=5):
+        """Up to limit known names starting with prefix, ignoring case"""
+        folded = prefix.casefold()
+        if not folded:
+            return []
+        return [name for _, name in self._with_prefix(folded, limit)]
+
+    def suggest(self, name, limit=3, cutoff=0.75):
+        """Known names that look like a mistyped version of name, closest first"""
+        folded = name.casefold()
+        candidates = {}
+        # Widen the search one character at a time from the full name back to its first letter
+        for length in range(len(folded), 0, -1):
+            for key, candidate in self._with_prefix(folded[:length], SUGGESTION_POOL):
+                candidates[candidate] = key
+            if len(candidates) >= SUGGESTION_POOL:
+                break
+        candidates.pop(name, None)
+        scored = _closest(folded, candidates.items(), cutoff)
+        if not scored:
+            # Nothing sharing a prefix is close, so the typo may be in the first letter
+            candidates = {}
+            for length in (len(folded), len(folded) - 1, len(folded) + 1):
+                for key, candidate in self.by_length.get(length, ())[:FALLBACK_POOL - len(candidates)]:
+                    candidates[candidate] = key
+            candidates.pop(name, None)
+            scored = _closest(folded, candidates.items(), cutoff)
+        return [candidate for _, candidate in scored[:limit]]
+
+
+def _closest(folded, candidates, cutoff):
+    """(-ratio, name) for every (name, folded key) at least cutoff alike, closest first"""
+    scored = []
+    matcher = difflib.SequenceMatcher()
+    matcher.set_seq2(folded)
+    for candidate, key in candidates:
+        matcher.set_seq1(key)
+        if matcher.real_quick_ratio() >= cutoff and matcher.quick_ratio() >= cutoff:
+            ratio = matcher.ratio()
+            if ratio >= cutoff:
+                scored.append((-ratio, candidate))
+    scored.sort()
+    return scored
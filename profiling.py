@@ -0,0 +1,156 @@
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+
+'''
+Built-in profiling for BlackJack Palace kiosks.
+Enable with --profile (timing spans around each round phase) or --profile-sample
+(spans plus a sampling profiler), or set PALACE_PROFILE=1 / PALACE_PROFILE=sample.
+On exit the report is written to files named after --profile-out (default palace_profile):
+  palace_profile.spans.txt   per-phase call counts and timings
+  palace_profile.collapsed   sampled stacks in collapsed format for flamegraph.pl / speedscope
+'''
+
+GAME_PHASES = ['bet_phase', 'deal_initial_cards', 'play_player_turn', 'dealer_turn', 'check_and_award_badges']
+# Every save goes through the leaderboard store, including update_player_stats
+# (with the background writer this times queueing; the write itself is "background_write")
+STORE_PHASES = ['save_player_stats']
+DEFAULT_OUTPUT = "palace_profile"
+SAMPLE_INTERVAL = 0.005
+
+
+class Profiler:
+    def __init__(self, output=DEFAULT_OUTPUT, sample=False, interval=SAMPLE_INTERVAL):
+        self.output = output
+        self.sample = sample
+        self.interval = interval
+        # name -> [calls, total ns, max ns]
+        self.spans = {}
+        self.stacks = {}
+        # thread id -> that thread's stack of open span names; read by the sampler thread
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._written = False
+
+    # Timing spans
+    def record(self, name, elapsed_ns):
+        # Spans can be recorded from other threads (the stats writer's "background_write")
+        with self._lock:
+            self._record(name, elapsed_ns)
+
+    def _record(self, name, elapsed_ns):
+        span = self.spans.get(name)
+        if span is None:
+            self.spans[name] = [1, elapsed_ns, elapsed_ns]
+        else:
+            span[0] += 1
+            span[1] += elapsed_ns
+            if elapsed_ns > span[2]:
+                span[2] = elapsed_ns
+
+    def timed(self, name, func):
+        """Wrap a callable so every call is recorded as a span"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self._lock:
+                active = self._active.setdefault(threading.get_ident(), [])
+                # A span re-entered from inside itself is already being timed by the outer call
+                outermost = name not in active
+                active.append(name)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed_ns = time.perf_counter_ns() - start
+                with self._lock:
+                    active.pop()
+                    if outermost:
+                        self._record(name, elapsed_ns)
+        return wrapper
+
+    def instrument(self, obj, names):
+        """Replace the named methods on one instance with timed versions"""
+        for name in names:
+            method = getattr(obj, name, None)
+            if method is not None:
+                setattr(obj, name, self.timed(name, method))
+
+    # Sampling profiler
+    def _sample_loop(self, thread_id):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            names.reverse()
+            # Tag samples with the sampled thread's innermost phase so flamegraphs group by round phase
+            with self._lock:
+                active = self._active.get(thread_id)
+                phase = active[-1] if active else None
+            if phase is not None:
+                names.insert(0, f"phase:{phase}")
+            stack = ';'.join(names)
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def start(self):
+        if self.sample and self._thread is None:
+            self._thread = threading.Thread(target=self._sample_loop, args=(threading.main_thread().ident,), name="palace-sampler", daemon=True)
+            self._thread.start()
+        atexit.register(self.finish)
+        return self
+
+    def finish(self):
+        """Stop sampling and write the report files (only the first call writes)"""
+        if self._written:
+            return
+        self._written = True
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with open(self.output + ".spans.txt", "w", encoding="utf-8") as f:
+            f.write(self.span_report() + "\n")
+        if self.sample:
+            with open(self.output + ".collapsed", "w", encoding="utf-8") as f:
+                for stack, count in sorted(self.stacks.items()):
+                    f.write(f"{stack} {count}\n")
+
+    def span_report(self):
+        lines = [f"{'phase':<26}{'calls':>8}{'total ms':>12}{'mean ms':>10}{'max ms':>10}"]
+        for name, (calls, total, longest) in sorted(self.spans.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name:<26}{calls:>8}{total / 1e6:12.2f}{total / calls / 1e6:10.3f}{longest / 1e6:10.3f}")
+        if self.sample:
+            lines.append(f"{sum(self.stacks.values())} samples every {self.interval * 1000:g} ms")
+        return '\n'.join(lines)
+
+
+def from_environment(argv=None):
+    """Build a Profiler from command-line flags or PALACE_PROFILE, or return None"""
+    argv = sys.argv[1:] if argv is None else argv
+    env = os.environ.get("PALACE_PROFILE", "").lower()
+    sample = "--profile-sample" in argv or env == "sample"
+    if not (sample or "--profile" in argv or env not in ("", "0")):
+        return None
+    output = os.environ.get("PALACE_PROFILE_OUT", DEFAULT_OUTPUT)
+    if "--profile-out" in argv:
+        index = argv.index("--profile-out")
+        if index + 1 < len(argv):
+            output = argv[index + 1]
+    return Profiler(output, sample=sample)
+
+
+def instrument_game(profiler, game):
+    """Put timing spans around the round phases of a BlackjackGame"""
+    profiler.instrument(game, GAME_PHASES)
+    profiler.instrument(game.leaderboard, STORE_PHASES)
+    if game.leaderboard.writer:
+        # Saves only queue work for the writer thread; time the actual file writes too
+        game.leaderboard.writer.on_write = lambda elapsed_ns: profiler.record("background_write", elapsed_ns)
@@ -0,0 +1,145 @@
+import argparse
+import time
+
+import numpy as np
+
+from house_edge import HouseRules, HouseEdgeCache, house_edge, fixed_policy_payoffs
+
+'''
+Bankroll risk-of-ruin and variance analyzer for BlackJack Palace.
+Simulates many sessions at once as NumPy random walks: every hand each live bankroll
+places a random bet in the bet range (all remaining chips below the minimum, like
+AIPlayer.place_bet) and moves by a net result drawn from the per-hand payoff
+distribution. Reports risk of ruin, how long sessions and two-player games last,
+and chip percentiles, for every starting stack and bet range asked for.
+Payoffs come from the exact analysis in house_edge.py (optimal play or the AI's
+hit-below-16 rule) or from the hands recorded in round_stats/.
+Run with: python3 risk_of_ruin.py --stacks 50 100 200 --bets 10-50 5-25 --policy ai
+'''
+
+POLICIES = ["basic", "ai", "history"]
+PERCENTILES = [5, 25, 50, 75, 95]
+DEFAULT_PATHS = 200000
+DEFAULT_HANDS = 500
+
+
+def load_payoffs(policy, rules=None, cache=None, round_stats_dir="round_stats"):
+    """{payoff key: probability} for one source of per-hand results"""
+    rules = rules or HouseRules()
+    cache = cache if cache is not None else HouseEdgeCache()
+    if policy == "basic":
+        return house_edge(rules, cache)["payoffs"]
+    if policy == "ai":
+        payoffs = cache.get(rules, "stand16")
+        if payoffs is None:
+            payoffs = fixed_policy_payoffs(rules, stand_on=16)
+            cache.put(rules, payoffs, "stand16")
+        return payoffs
+    if policy == "history":
+        from round_stats import RoundStatsStore
+        payoffs = RoundStatsStore(round_stats_dir).payoff_distribution()
+        if not payoffs:
+            raise ValueError(f"No recorded hands in {round_stats_dir}")
+        return payoffs
+    raise ValueError(f"policy must be one of {', '.join(POLICIES)}")
+
+
+def simulate(payoffs, start=100, bet_min=10, bet_max=50, paths=DEFAULT_PATHS, max_hands=DEFAULT_HANDS, seed=None):
+    """Play paths bankrolls for up to max_hands hands each.
+
+    Returns (final chips, hands played before going broke or max_hands) as arrays.
+    Doubles (payoff +-2) that the bankroll can't cover are played as ordinary hands.
+    """
+    rng = np.random.default_rng(seed)
+    multiples = np.array([float(key) for key in payoffs])
+    cdf = np.cumsum([payoffs[key] for key in payoffs])
+    cdf /= cdf[-1]
+    chips = np.full(paths, start, dtype=np.int64)
+    hands = np.full(paths, max_hands, dtype=np.int32)
+    live = np.arange(paths)
+    for hand in range(max_hands):
+        if not live.size:
+            break
+        stack = chips[live]
+        high = np.maximum(np.minimum(bet_max, stack), bet_min)
+        bet = np.where(stack < bet_min, stack, rng.integers(bet_min, high + 1))
+        multiple = multiples[np.minimum(np.searchsorted(cdf, rng.random(live.size), side="right"), len(cdf) - 1)]
+        multiple = np.where((np.abs(multiple) == 2) & (stack < 2 * bet), np.sign(multiple), multiple)
+        # Winnings round down like Player.win_bet's int(2.5 * bet)
+        stack += np.floor(multiple * bet).astype(np.int64)
+        chips[live] = stack
+        broke = stack <= 0
+        hands[live[broke]] = hand + 1
+        live = live[~broke]
+    return np.maximum(chips, 0), hands
+
+
+def summarize(chips, hands, max_hands, players=2):
+    """Risk of ruin, session lengths and chip percentiles for one simulate() run"""
+    broke = (hands < max_hands) | (chips <= 0)
+    games = len(hands) // players
+    # A game ends as soon as one seat is broke (check_game_over); seats are treated as independent
+    game_length = hands[:games * players].reshape(games, players).min(axis=1)
+    return {
+        "risk_of_ruin": float(broke.mean()),
+        "mean_hands": float(hands.mean()),
+        "median_hands": float(np.median(hands)),
+        "mean_game_hands": float(game_length.mean()),
+        "game_over_rate": float((game_length < max_hands).mean()) if games else 0.0,
+        "mean_chips": float(chips.mean()),
+        "chip_percentiles": dict(zip(PERCENTILES, np.percentile(chips, PERCENTILES).tolist())),
+    }
+
+
+def sweep(payoffs, stacks, bet_ranges, paths=DEFAULT_PATHS, max_hands=DEFAULT_HANDS, players=2, seed=None):
+    """summarize() for every (starting stack, (bet_min, bet_max)) pair"""
+    results = []
+    for start in stacks:
+        for bet_min, bet_max in bet_ranges:
+            began = time.perf_counter()
+            chips, hands = simulate(payoffs, start, bet_min, bet_max, paths, max_hands, seed)
+            result = summarize(chips, hands, max_hands, players)
+            result.update(start=start, bet_min=bet_min, bet_max=bet_max, seconds=time.perf_counter() - began)
+            results.append(result)
+    return results
+
+
+def format_results(payoffs, results, paths, max_hands):
+    ev = sum(float(key) * p for key, p in payoffs.items())
+    lines = [
+        f"Per-hand EV {ev * 100:+.3f}% of the bet; {paths} bankrolls, up to {max_hands} hands",
+        f"{'stack':>6}{'bets':>9}{'ruin':>8}{'hands':>8}{'game':>7}  chips p5/p25/p50/p75/p95",
+    ]
+    for r in results:
+        pct = '/'.join(f"{value:g}" for value in r["chip_percentiles"].values())
+        lines.append(f"{r['start']:>6}{r['bet_min']:>4}-{r['bet_max']:<4}{r['risk_of_ruin'] * 100:7.2f}%"
+                     f"{r['mean_hands']:8.1f}{r['mean_game_hands']:7.1f}  {pct}")
+    return '\n'.join(lines)
+
+
+def parse_bet_range(text):
+    low, _, high = text.partition("-")
+    low, high = int(low), int(high or low)
+    if not 0 < low <= high:
+        raise argparse.ArgumentTypeError(f"bad bet range {text!r}; use MIN-MAX")
+    return low, high
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Risk of ruin for BlackJack Palace bankrolls and bet limits")
+    parser.add_argument("--stacks", type=int, nargs="+", default=[100], help="starting chips")
+    parser.add_argument("--bets", type=parse_bet_range, nargs="+", default=[(10, 50)], help="bet ranges as MIN-MAX")
+    parser.add_argument("--policy", choices=POLICIES, default="ai", help="where per-hand results come from")
+    parser.add_argument("--paths", type=int, default=DEFAULT_PATHS)
+    parser.add_argument("--hands", type=int, default=DEFAULT_HANDS, help="longest session simulated")
+    parser.add_argument("--players", type=int, default=2, help="seats per game for game length")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--round-stats", default="round_stats")
+    args = parser.parse_args(argv)
+    payoffs = load_payoffs(args.policy, round_stats_dir=args.round_stats)
+    results = sweep(payoffs, args.stacks, args.bets, args.paths, args.hands, args.players, args.seed)
+    print(format_results(payoffs, results, args.paths, args.hands))
+
+
+if __name__ == '__main__':
+    main()
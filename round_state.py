@@ -0,0 +1,208 @@
+import atexit
+import json
+import os
+import threading
+
+from blackjack_models import Card, Deck, Dealer, SUITS, RANKS
+
+'''
+Explicit round state machine and snapshots for BlackJack Palace.
+The game moves a RoundStateMachine through the phases below as a round progresses and
+snapshots the whole round (phase, deck order, hands, bets, chips) on every transition and
+after every player action. A crashed or restarted kiosk can resume from the last snapshot,
+and tests or benchmarks can start a game from any mid-round state.
+Once started, SnapshotFile writes on its own thread (only the newest snapshot is kept
+waiting), while clear() is synchronous so a settled round's snapshot is gone before any of
+its results are saved.
+
+Snapshots are compact versioned JSON; each card is one byte (suit * 13 + rank), hex-encoded.
+'''
+
+SNAPSHOT_VERSION = 1
+DEFAULT_SNAPSHOT_FILE = "round_snapshot.json"
+
+IDLE = "idle"
+SHUFFLE = "shuffle"
+BET = "bet"
+INSURANCE = "insurance"
+PLAYER_TURN = "player_turn"
+DEALER_TURN = "dealer_turn"
+SETTLED = "settled"
+
+# Allowed next phases. A phase may always be re-entered (each bet, insurance decision or
+# card redraws its screen) and any phase may go back to IDLE (the start screen).
+TRANSITIONS = {
+    IDLE: {SHUFFLE},
+    SHUFFLE: {BET},
+    BET: {INSURANCE, PLAYER_TURN, SETTLED},
+    INSURANCE: {PLAYER_TURN, SETTLED},
+    PLAYER_TURN: {DEALER_TURN},
+    DEALER_TURN: {SETTLED},
+    SETTLED: {SHUFFLE},
+}
+# Phases with chips on the table that are worth resuming after a crash
+RESUMABLE = {SHUFFLE, BET, INSURANCE, PLAYER_TURN, DEALER_TURN}
+
+
+class RoundStateMachine:
+    def __init__(self, phase=IDLE, on_enter=None):
+        self.phase = phase
+        self.on_enter = on_enter
+
+    def enter(self, phase):
+        if phase not in (IDLE, self.phase) and phase not in TRANSITIONS[self.phase]:
+            raise ValueError(f"Invalid round transition {self.phase} -> {phase}")
+        self.phase = phase
+        if self.on_enter:
+            self.on_enter(phase)
+
+    def restore(self, phase):
+        """Jump straight to a phase loaded from a snapshot"""
+        self.phase = phase
+
+
+def encode_cards(cards):
+    return bytes(SUITS.index(card.suit) * 13 + RANKS.index(card.rank) for card in cards).hex()
+
+
+def decode_cards(text):
+    return [Card(SUITS[code // 13], RANKS[code % 13]) for code in bytes.fromhex(text)]
+
+
+def capture(game, phase):
+    """Everything needed to rebuild the current round, as a JSON-ready dict"""
+    return {
+        "v": SNAPSHOT_VERSION,
+        "phase": phase,
+        "player_idx": game.current_player_idx,
+        "insurance_idx": getattr(game, 'insurance_player_idx', 0),
+        "vs_ai": bool(getattr(game, 'vs_ai_mode', False)),
+        "deck": encode_cards(game.deck.cards) if game.deck else "",
+        "dealer": encode_cards(game.dealer.hand),
+        "players": [
+            {
+                "name": player.name,
+                "ai": bool(getattr(player, 'is_ai', False)),
+                "chips": player.chips,
+                "bet": player.bet,
+                "insurance": player.insurance_bet,
+                "doubled": player.doubled_down,
+                "streak": getattr(player, 'win_streak', 0),
+                "wins": player.wins,
+                "hand": encode_cards(player.hand),
+            }
+            for player in game.players
+        ],
+    }
+
+
+def restore_models(state, make_player):
+    """Rebuild (players, deck, dealer) from a snapshot.
+
+    make_player(name, is_ai, wins) returns a fresh Player; round fields are filled in here.
+    """
+    players = []
+    for entry in state["players"]:
+        player = make_player(entry["name"], entry["ai"], entry["wins"])
+        player.chips = entry["chips"]
+        player.bet = entry["bet"]
+        player.insurance_bet = entry["insurance"]
+        player.doubled_down = entry["doubled"]
+        player.win_streak = entry["streak"]
+        player.hand = decode_cards(entry["hand"])
+        players.append(player)
+    deck = Deck(decode_cards(state["deck"]))
+    dealer = Dealer()
+    dealer.hand = decode_cards(state["dealer"])
+    return players, deck, dealer
+
+
+def dumps(state):
+    return json.dumps(state, separators=(',', ':'))
+
+
+def loads(text):
+    state = json.loads(text)
+    if state.get("v") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported round snapshot version {state.get('v')}")
+    return state
+
+
+class SnapshotFile:
+    def __init__(self, path=DEFAULT_SNAPSHOT_FILE):
+        self.path = path
+        self._pending = None
+        self._closing = False
+        # Bumped by clear(); a snapshot taken before the clear must never be written after it
+        self._generation = 0
+        self._lock = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Write snapshots on a background thread from now on"""
+        self._thread = threading.Thread(target=self._run, name="round-snapshots", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    def save(self, state):
+        if self._thread is None:
+            self._write(state, self._generation)
+            return
+        with self._lock:
+            self._pending = (state, self._generation)
+            self._lock.notify_all()
+
+    def close(self):
+        """Write the newest pending snapshot, then stop the writer thread"""
+        if self._thread is None:
+            return
+        with self._lock:
+            self._closing = True
+            self._lock.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while self._pending is None and not self._closing:
+                    self._lock.wait()
+                pending, self._pending = self._pending, None
+                closing = self._closing
+            if pending is not None:
+                self._write(*pending)
+            if closing:
+                return
+
+    def _write(self, state, generation):
+        with self._write_lock:
+            if generation != self._generation:
+                return
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(dumps(state))
+            os.replace(tmp_path, self.path)
+
+    def load(self):
+        """The saved round if there is a resumable one, else None"""
+        try:
+            with open(self.path, "r") as f:
+                state = loads(f.read())
+        except Exception:
+            return None
+        return state if state["phase"] in RESUMABLE else None
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._pending = None
+        # Waits for a write already in progress, so nothing lands after the file is removed
+        with self._write_lock:
+            self._remove()
+
+    def _remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,247 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from blackjack_models import OUTCOME_WIN, OUTCOME_BLACKJACK, OUTCOME_NAMES
+
+'''
+Columnar per-round history for BlackJack Palace.
+Every settled seat is appended as one row spread over fixed-dtype column files
+(<name>.bin, raw little-endian arrays) so analytics can memory-map them and run
+vectorized aggregations without parsing logs or touching leaderboard.json.
+Once started, the store appends each flushed round (and rewrites players.json when a new
+player joins) on its own thread, so settlement never waits on the disk.
+'''
+
+COLUMNS = {
+    "round_id": np.dtype("<i8"),
+    "timestamp": np.dtype("<f8"),
+    "player_id": np.dtype("<i4"),
+    "dealer_upcard": np.dtype("i1"),   # card value, Ace counts as 11
+    "player_total": np.dtype("i1"),
+    "dealer_total": np.dtype("i1"),
+    "num_cards": np.dtype("i1"),
+    "outcome": np.dtype("i1"),
+    "doubled": np.dtype("?"),
+    "natural_round": np.dtype("?"),    # settled by check_natural_blackjacks
+    "bet": np.dtype("<i4"),
+    "insurance": np.dtype("<i4"),
+    "payout": np.dtype("<i4"),         # chips returned to the player at settlement
+    "chips_after": np.dtype("<i4"),
+}
+
+
+class RoundStatsStore:
+    def __init__(self, directory="round_stats"):
+        self.directory = directory
+        self._pending = {name: [] for name in COLUMNS}
+        self._names = None
+        self._names_changed = False
+        self._next_round_id = None
+        # Flushed (columns, names or None) batches waiting for the writer thread
+        self._batches = []
+        self._closing = False
+        self._lock = threading.Condition()
+        self._thread = None
+        self.write_errors = 0
+        self.last_error = None
+        self._unsaved_names = None
+
+    def start(self):
+        """Write flushed rounds on a background thread from now on"""
+        self._thread = threading.Thread(target=self._run, name="round-stats", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    def close(self):
+        """Write every flushed round, then stop the writer thread"""
+        if self._thread is None:
+            return
+        with self._lock:
+            self._closing = True
+            self._lock.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._batches and not self._closing:
+                    self._lock.wait()
+                batches, self._batches = self._batches, []
+                closing = self._closing
+            for batch in batches:
+                self._write(*batch)
+            if closing:
+                with self._lock:
+                    if not self._batches:
+                        return
+
+    # Player names are stored once and referenced by integer id
+    def _names_path(self):
+        return os.path.join(self.directory, "players.json")
+
+    def _load_names(self):
+        if self._names is None:
+            try:
+                with open(self._names_path(), "r") as f:
+                    self._names = json.load(f)
+            except Exception:
+                self._names = []
+            self._name_ids = {name: i for i, name in enumerate(self._names)}
+        return self._names
+
+    def player_id(self, name, create=True):
+        self._load_names()
+        if name not in self._name_ids:
+            if not create:
+                return None
+            self._name_ids[name] = len(self._names)
+            self._names.append(name)
+            # Saved with the next flush, before any row that refers to the new id
+            self._names_changed = True
+        return self._name_ids[name]
+
+    def _write_names(self, names):
+        tmp_path = self._names_path() + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(names, f)
+        os.replace(tmp_path, self._names_path())
+
+    def _column_path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def __len__(self):
+        return self._row_count()
+
+    def _row_count(self):
+        # Columns can only disagree after an interrupted flush; the shortest one is authoritative
+        counts = []
+        for name, dtype in COLUMNS.items():
+            path = self._column_path(name)
+            counts.append(os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0)
+        return min(counts)
+
+    def _repair(self, rows):
+        for name, dtype in COLUMNS.items():
+            path = self._column_path(name)
+            if os.path.exists(path) and os.path.getsize(path) != rows * dtype.itemsize:
+                with open(path, "r+b") as f:
+                    f.truncate(rows * dtype.itemsize)
+
+    def begin_round(self):
+        """Return the id for a new round"""
+        if self._next_round_id is None:
+            rows = self._row_count()
+            self._repair(rows)
+            last = self.column("round_id")[-1] if rows else -1
+            self._next_round_id = int(last) + 1
+        round_id = self._next_round_id
+        self._next_round_id += 1
+        return round_id
+
+    def record(self, round_id, name, dealer_upcard, player_total, dealer_total, num_cards, outcome,
+               doubled, natural_round, bet, insurance, payout, chips_after):
+        """Buffer one settled seat; call flush() once the round is over"""
+        row = (round_id, time.time(), self.player_id(name), dealer_upcard, player_total, dealer_total,
+               num_cards, outcome, doubled, natural_round, bet, insurance, payout, chips_after)
+        for column, value in zip(COLUMNS, row):
+            self._pending[column].append(value)
+
+    def flush(self):
+        """Append the buffered rows, on the writer thread once started"""
+        if not self._pending["round_id"]:
+            return
+        batch = (self._pending, list(self._names) if self._names_changed else None)
+        self._pending = {name: [] for name in COLUMNS}
+        self._names_changed = False
+        if self._thread is None:
+            self._write(*batch)
+            return
+        with self._lock:
+            self._batches.append(batch)
+            self._lock.notify_all()
+
+    def _write(self, columns, names):
+        # A names list whose write failed is kept and written with the next batch
+        names = self._unsaved_names = names if names is not None else self._unsaved_names
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if names is not None:
+                self._write_names(names)
+                self._unsaved_names = None
+            for name, dtype in COLUMNS.items():
+                with open(self._column_path(name), "ab") as f:
+                    np.asarray(columns[name], dtype=dtype).tofile(f)
+        except OSError as exc:
+            if self._thread is None:
+                raise
+            self.write_errors += 1
+            self.last_error = exc
+
+    # Queries
+    def column(self, name):
+        """Memory-mapped, read-only view of one column"""
+        dtype = COLUMNS[name]
+        rows = self._row_count()
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._column_path(name), dtype=dtype, mode="r", shape=(rows,))
+
+    def _mask(self, player=None):
+        if player is None:
+            return slice(None)
+        pid = self.player_id(player, create=False)
+        if pid is None:
+            return np.zeros(self._row_count(), dtype=bool)
+        return self.column("player_id") == pid
+
+    def win_rate_by_upcard(self, player=None):
+        """Map dealer upcard value (2-11) to the fraction of hands won against it"""
+        mask = self._mask(player)
+        upcards = np.asarray(self.column("dealer_upcard")[mask], dtype=np.intp)
+        outcome = self.column("outcome")[mask]
+        won = (outcome == OUTCOME_WIN) | (outcome == OUTCOME_BLACKJACK)
+        hands = np.bincount(upcards, minlength=12)
+        wins = np.bincount(upcards, weights=won, minlength=12)
+        return {upcard: float(wins[upcard] / hands[upcard]) for upcard in range(2, 12) if hands[upcard]}
+
+    def outcome_counts(self, player=None):
+        counts = np.bincount(self.column("outcome")[self._mask(player)], minlength=len(OUTCOME_NAMES))
+        return dict(zip(OUTCOME_NAMES, counts.tolist()))
+
+    def chip_trajectory(self, player):
+        """Return (timestamps, chips after each round) for one player"""
+        mask = self._mask(player)
+        return np.asarray(self.column("timestamp")[mask]), np.asarray(self.column("chips_after")[mask])
+
+    def double_down_success_rate(self, player=None):
+        mask = self._mask(player)
+        doubled = self.column("doubled")[mask]
+        if not doubled.any():
+            return None
+        outcome = self.column("outcome")[mask][doubled]
+        return float(np.count_nonzero(outcome == OUTCOME_WIN)) / len(outcome)
+
+    def payoff_distribution(self, player=None):
+        """Net result per hand in units of the starting bet (e.g. "-2" for a lost double) -> share of hands"""
+        mask = self._mask(player)
+        bet = self.column("bet")[mask].astype(np.float64)
+        base = np.where(self.column("doubled")[mask], bet / 2, bet)
+        played = base > 0
+        net = self.column("payout")[mask] - bet - self.column("insurance")[mask]
+        # Snap to half bets so rounded-down blackjack payouts count as 1.5
+        multiples = np.round(net[played] / base[played] * 2) / 2 + 0.0  # + 0.0 turns -0.0 into 0.0
+        values, counts = np.unique(multiples, return_counts=True)
+        return {f"{value:g}": float(count / counts.sum()) for value, count in zip(values, counts)}
+
+    def net_chips(self, player=None):
+        """Total chips won (positive) or lost by players across all recorded rounds"""
+        mask = self._mask(player)
+        payout = self.column("payout")[mask].astype(np.int64)
+        staked = self.column("bet")[mask].astype(np.int64) + self.column("insurance")[mask]
+        return int((payout - staked).sum())
@@ -0,0 +1,306 @@
+import argparse
+import functools
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+'''
+Session recording and deterministic playback for BlackJack Palace.
+Recording (--record-session FILE or PALACE_RECORD=FILE) logs every player input as one
+JSON line: names typed, bets entered, Hit/Stand/Double and insurance choices, popup OKs,
+theme choices and screen navigation, each with its time, the screen it was made on and
+whose turn it was. Every round is dealt from a fresh RNG seed that is logged too.
+Playback rebuilds the game on a VirtualClock in a scratch directory and feeds the inputs
+back through the real Tk widgets as fast as possible, reseeding each round the same way,
+and times every screen transition from the input (or timer) that caused it to the new
+screen being laid out.
+Run with: python3 session_recorder.py play session.jsonl [--repeat 5] [--leaderboard leaderboard.json]
+'''
+
+SESSION_VERSION = 1
+
+# Recorded game methods -> the button that triggers them (None: called directly on playback)
+ACTIONS = {
+    "start_game": "start_button",
+    "start_game_vs_ai": "ai_button",
+    "place_bet": "bet_button",
+    "hit": "hit_button",
+    "stand": "stand_button",
+    "double_down": "double_button",
+    "take_insurance": None,
+    "decline_insurance": None,
+    "popup_ok": "popup_ok_button",
+    "set_card_theme": None,
+    "show_customize_page": None,
+    "show_achievements_leaderboard": None,
+    "show_leaderboard": None,
+    "show_leaderboard_menu": None,
+    "restart_game": None,
+    "setup_start_screen": None,
+    "resume_round": None,
+}
+INSURANCE_ACTIONS = ("take_insurance", "decline_insurance")
+
+
+def _called_from_tk(frame):
+    """True when a frame was entered from a Tk widget callback (directly or through a lambda)"""
+    if frame.f_code.co_name == "<lambda>":
+        frame = frame.f_back
+    return frame is not None and os.path.join("tkinter", "") in frame.f_code.co_filename
+
+
+class ScreenTracker:
+    """Names the current screen after whichever game method last built one"""
+
+    def __init__(self, game, on_change=None):
+        self.screen = None
+        self.on_change = on_change
+        build = game._get_centered_frame
+
+        @functools.wraps(build)
+        def tracked():
+            self.screen = sys._getframe(1).f_code.co_name
+            if self.on_change:
+                self.on_change(self.screen)
+            return build()
+        game._get_centered_frame = tracked
+
+
+class _SeededRounds:
+    """Reseeds the RNG at the start of each round from a seed source"""
+
+    def __init__(self, game, next_seed):
+        play_round = game.play_round
+
+        @functools.wraps(play_round)
+        def seeded():
+            random.seed(next_seed())
+            return play_round()
+        game.play_round = seeded
+
+
+class SessionRecorder:
+    def __init__(self, game, path):
+        self.game = game
+        self.started = time.monotonic()
+        self.file = open(path, "w", encoding="utf-8")
+        self.screens = ScreenTracker(game)
+        self._write({"v": SESSION_VERSION, "recorded": time.time(), "theme": getattr(game, 'card_theme', None)})
+        _SeededRounds(game, self._new_seed)
+        rebuild_start_screen = game.setup_start_screen
+        for action in ACTIONS:
+            setattr(game, action, self._recorded(action, getattr(game, action)))
+        # Rebuild the start screen so its buttons call the recorded methods
+        rebuild_start_screen()
+
+    def _write(self, entry):
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def _event(self, action, **fields):
+        game = self.game
+        entry = {
+            "t": round(time.monotonic() - self.started, 4),
+            "action": action,
+            "screen": self.screens.screen,
+            "player": game.insurance_player_idx if action in INSURANCE_ACTIONS else game.current_player_idx,
+        }
+        entry.update(fields)
+        self._write(entry)
+
+    def _new_seed(self):
+        seed = int.from_bytes(os.urandom(4), "little")
+        self._event("seed", seed=seed)
+        return seed
+
+    def _recorded(self, action, method):
+        game = self.game
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            # The game calls some of these itself (e.g. show_leaderboard_menu after a round); only inputs count
+            if not _called_from_tk(sys._getframe(1)):
+                return method(*args, **kwargs)
+            fields = {}
+            if action == "start_game":
+                fields = {"names": [game.player1_entry.get(), game.player2_entry.get()], "coaching": game.coaching_var.get()}
+            elif action == "start_game_vs_ai":
+                fields = {"names": [game.player1_entry.get()], "coaching": game.coaching_var.get()}
+            elif action == "place_bet":
+                fields = {"amount": game.bet_entry.get()}
+            elif action == "take_insurance":
+                fields = {"cost": args[1]}
+            elif action == "set_card_theme":
+                fields = {"args": list(args), "kwargs": kwargs}
+            self._event(action, **fields)
+            return method(*args, **kwargs)
+        return wrapper
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+def load_session(path):
+    """(header, seeds, input events) from a recorded session file"""
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    header = lines[0]
+    if header.get("v") != SESSION_VERSION:
+        raise ValueError(f"Unsupported session version {header.get('v')}")
+    seeds = [entry["seed"] for entry in lines[1:] if entry["action"] == "seed"]
+    events = [entry for entry in lines[1:] if entry["action"] != "seed"]
+    return header, seeds, events
+
+
+class SessionPlayer:
+    """Replays a recorded session against a BlackjackGame driven by a VirtualClock"""
+
+    def __init__(self, game, clock, seeds, events):
+        self.game = game
+        self.clock = clock
+        self.events = events
+        self.skipped = []
+        # (from screen, to screen) -> list of seconds
+        self.transitions = {}
+        self._changes = []
+        self.screens = ScreenTracker(game, on_change=self._changes.append)
+        seeds = iter(seeds)
+        _SeededRounds(game, lambda: next(seeds, 0))
+        game.setup_start_screen()
+        self.screens.screen = "setup_start_screen"
+
+    def _widget(self, event):
+        name = ACTIONS.get(event["action"])
+        widget = getattr(self.game, name, None) if name else None
+        return widget if widget is not None and widget.winfo_exists() else None
+
+    def ready(self, event):
+        game = self.game
+        popup = getattr(game, 'popup_ok_button', None)
+        popup_open = popup is not None and popup.winfo_exists()
+        if popup_open != (event["action"] == "popup_ok"):
+            return False
+        if event["action"] == "popup_ok":
+            return True
+        if self.screens.screen != event["screen"]:
+            return False
+        if event["action"] in INSURANCE_ACTIONS:
+            return getattr(game, 'insurance_player_idx', None) == event["player"]
+        if game.current_player_idx != event["player"]:
+            return False
+        return ACTIONS[event["action"]] is None or self._widget(event) is not None
+
+    def deliver(self, event):
+        game = self.game
+        action = event["action"]
+        if action in ("start_game", "start_game_vs_ai"):
+            entries = [game.player1_entry, game.player2_entry]
+            for entry, name in zip(entries, event["names"]):
+                entry.delete(0, "end")
+                entry.insert(0, name)
+            game.coaching_var.set(event["coaching"])
+        elif action == "place_bet":
+            game.bet_entry.delete(0, "end")
+            game.bet_entry.insert(0, event["amount"])
+        widget = self._widget(event)
+        if widget is not None:
+            widget.invoke()
+        elif action == "take_insurance":
+            game.take_insurance(game.players[game.insurance_player_idx], event["cost"])
+        elif action == "set_card_theme":
+            game.set_card_theme(*event["args"], **event["kwargs"])
+        else:
+            getattr(game, action)()
+
+    def _timed(self, run):
+        """Run one input or timer callback and time any screen change it causes until laid out"""
+        before = self.screens.screen
+        del self._changes[:]
+        start = time.perf_counter()
+        result = run()
+        if self._changes:
+            self.game.root.update_idletasks()
+            elapsed = time.perf_counter() - start
+            self.transitions.setdefault((before, self._changes[-1]), []).append(elapsed)
+        return result
+
+    def play(self):
+        started = time.perf_counter()
+        for event in self.events:
+            while not self.ready(event):
+                if not self._timed(self.clock.step):
+                    # Nothing left that could bring the recorded screen back; the run diverged here
+                    self.skipped.append(event)
+                    break
+            else:
+                self._timed(lambda: self.deliver(event))
+        # Let the last screen's timers (dealer reveal, game over, ...) finish
+        while self._timed(self.clock.step):
+            pass
+        return time.perf_counter() - started
+
+    def report(self, elapsed):
+        lines = [f"{len(self.events)} inputs replayed in {elapsed * 1000:.1f} ms ({len(self.skipped)} skipped)",
+                 f"{'transition':<56}{'count':>6}{'mean ms':>10}{'max ms':>10}"]
+        for (before, after), times in sorted(self.transitions.items(), key=lambda item: -sum(item[1])):
+            lines.append(f"{f'{before} -> {after}':<56}{len(times):>6}{sum(times) / len(times) * 1000:10.2f}{max(times) * 1000:10.2f}")
+        return '\n'.join(lines)
+
+
+def from_environment(game, argv=None):
+    """Start a SessionRecorder if --record-session FILE or PALACE_RECORD=FILE asks for one"""
+    argv = sys.argv[1:] if argv is None else argv
+    path = os.environ.get("PALACE_RECORD")
+    if "--record-session" in argv:
+        index = argv.index("--record-session")
+        if index + 1 < len(argv):
+            path = argv[index + 1]
+    return SessionRecorder(game, path) if path else None
+
+
+def play(path, repeat=1, leaderboard=None):
+    import tkinter as tk
+    from BlackJackPalace import BlackjackGame
+    from game_clock import VirtualClock
+    header, seeds, events = load_session(path)
+    for run in range(repeat):
+        # Work in a scratch directory so playback never touches real stats or snapshots
+        work_dir = tempfile.mkdtemp(prefix="palace-playback-")
+        if leaderboard:
+            shutil.copy(leaderboard, os.path.join(work_dir, "leaderboard.json"))
+        cwd = os.getcwd()
+        os.chdir(work_dir)
+        try:
+            root = tk.Tk()
+            clock = VirtualClock()
+            game = BlackjackGame(root, clock)
+            if header.get("theme"):
+                game.card_theme = header["theme"]
+            player = SessionPlayer(game, clock, seeds, events)
+            elapsed = player.play()
+            game.leaderboard.close()
+            print(f"Run {run + 1}: " + player.report(elapsed))
+            root.destroy()
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded BlackJack Palace sessions as benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    replay = commands.add_parser("play", help="replay a recorded session as fast as possible")
+    replay.add_argument("session")
+    replay.add_argument("--repeat", type=int, default=1)
+    replay.add_argument("--leaderboard", help="leaderboard file to start from (a copy is used)")
+    args = parser.parse_args(argv)
+    play(args.session, args.repeat, args.leaderboard)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import numpy as np
+
+from blackjack_models import OUTCOME_LOSS, OUTCOME_WIN, OUTCOME_PUSH, OUTCOME_BLACKJACK, OUTCOME_BUST, OUTCOME_NAMES
+
+'''
+Vectorized bet settlement for BlackJack Palace.
+settle() resolves any number of seats in one NumPy pass with exactly the payouts of
+Player.win_bet/push_bet and the insurance rules in dealer_turn. Seats can come from one
+table or from millions of simulated rounds: the dealer arguments broadcast, so pass a
+scalar for a single round or one value per seat for a batch.
+'''
+
+
+def settle(bets, player_totals, dealer_totals, blackjacks, insurance=None, dealer_blackjack=False,
+           doubled=None, win_streaks=None, wins=None, blackjack_payout=1.5):
+    """Settle every seat at once.
+
+    bets are the full amounts riding on each hand (already doubled after a double down,
+    like Player.bet); doubled only feeds the double-down tallies. Returns a dict of
+    per-seat arrays (outcome, payout, insurance_payout, win_streak, wins) plus
+    round totals (house_net, outcome counts, doubles_won).
+    """
+    bets = np.asarray(bets, dtype=np.int64)
+    player_totals = np.asarray(player_totals)
+    dealer_totals = np.broadcast_to(np.asarray(dealer_totals), bets.shape)
+    blackjacks = np.asarray(blackjacks, dtype=bool)
+    insurance = np.zeros_like(bets) if insurance is None else np.asarray(insurance, dtype=np.int64)
+    dealer_blackjack = np.broadcast_to(np.asarray(dealer_blackjack, dtype=bool), bets.shape)
+    doubled = np.zeros(bets.shape, dtype=bool) if doubled is None else np.asarray(doubled, dtype=bool)
+    win_streaks = np.zeros_like(bets) if win_streaks is None else np.asarray(win_streaks, dtype=np.int64)
+    wins = np.zeros_like(bets) if wins is None else np.asarray(wins, dtype=np.int64)
+
+    bust = player_totals > 21
+    won = ~bust & ((dealer_totals > 21) | (player_totals > dealer_totals))
+    push = ~bust & ~won & (player_totals == dealer_totals)
+
+    outcome = np.full(bets.shape, OUTCOME_LOSS, dtype=np.int8)
+    outcome[bust] = OUTCOME_BUST
+    outcome[push] = OUTCOME_PUSH
+    outcome[won] = OUTCOME_WIN
+    outcome[won & blackjacks] = OUTCOME_BLACKJACK
+
+    # Blackjack returns the stake plus the payout, rounded down like int(2.5 * bet)
+    blackjack_return = np.floor(bets * (1 + blackjack_payout)).astype(np.int64)
+    payout = np.where(won, np.where(blackjacks, blackjack_return, 2 * bets), np.where(push, bets, 0))
+    # Insurance pays 2:1 plus the insurance stake back
+    insurance_payout = np.where(dealer_blackjack, insurance * 3, 0)
+
+    counts = np.bincount(outcome, minlength=len(OUTCOME_NAMES))
+    return {
+        "outcome": outcome,
+        "payout": payout,
+        "insurance_payout": insurance_payout,
+        "win_streak": np.where(won, win_streaks + 1, 0),
+        "wins": wins + won,
+        "house_net": int(bets.sum() + insurance.sum() - payout.sum() - insurance_payout.sum()),
+        "outcome_counts": dict(zip(OUTCOME_NAMES, counts.tolist())),
+        "doubles_won": int(np.count_nonzero(doubled & won)),
+    }
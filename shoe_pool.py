@@ -0,0 +1,239 @@
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import time
+
+from blackjack_models import Card, SUITS, RANKS
+
+'''
+Pre-shuffled shoe files for BlackJack Palace.
+A shoe file holds many shuffled shoes, one byte per card (suit * 13 + rank, the same
+code round snapshots use), each preceded by the SHA-256 of its cards. Files are made
+offline, memory-mapped at the table and dealt from in place: dealing a card is a
+pointer step and a table lookup, with no Card objects built or shuffled per round.
+The header keeps the generator seed, so an auditor can check every shoe is a complete
+deck with a matching hash and regenerate the whole file from the seed to compare.
+  python3 shoe_pool.py generate shoes.bin --shoes 1000000 [--decks 1] [--seed N]
+  python3 shoe_pool.py verify shoes.bin [--regenerate]
+Play from a file with --shoe-file shoes.bin or PALACE_SHOE_FILE=shoes.bin; the next unused
+shoe is remembered in shoes.bin.next so no shoe is dealt twice.
+'''
+
+MAGIC = b"PALSHOE\0"
+FORMAT_VERSION = 1
+# magic, version, decks, cards per shoe, shoe count, shoes per generation batch, seed (128 bits)
+HEADER = struct.Struct("<8sHHIQI16s")
+DIGEST_SIZE = 32
+DEFAULT_BATCH = 65536
+# Every card code's Card, shared by every deck dealt from a file
+CARDS = [Card(SUITS[code // 13], RANKS[code % 13]) for code in range(52)]
+
+
+def shoe_digest(cards):
+    return hashlib.sha256(cards).digest()
+
+
+def _shuffled_batches(decks, shoes, seed, batch):
+    """Yield (count, 2-D uint8 array of shuffled shoes) batch by batch, reproducibly from seed"""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    deck = np.tile(np.arange(52, dtype=np.uint8), decks)
+    for start in range(0, shoes, batch):
+        count = min(batch, shoes - start)
+        yield count, rng.permuted(np.broadcast_to(deck, (count, deck.size)), axis=1)
+
+
+def generate(path, shoes, decks=1, seed=None, batch=DEFAULT_BATCH):
+    """Write a shoe file and return its file digest (SHA-256 over every shoe's hash)"""
+    if seed is None:
+        seed = int.from_bytes(os.urandom(16), "little")
+    cards_per_shoe = 52 * decks
+    file_digest = hashlib.sha256()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, decks, cards_per_shoe, shoes, batch, seed.to_bytes(16, "little")))
+        for count, block in _shuffled_batches(decks, shoes, seed, batch):
+            out = bytearray()
+            for row in block:
+                cards = row.tobytes()
+                digest = shoe_digest(cards)
+                file_digest.update(digest)
+                out += digest
+                out += cards
+            f.write(out)
+    os.replace(tmp_path, path)
+    return file_digest.hexdigest()
+
+
+class MappedDeck:
+    """A Deck dealing from one shoe of a memory-mapped file.
+
+    Cards are dealt from the end like Deck.deal_card, so cards[-1] is always next.
+    """
+
+    def __init__(self, view, shoe_id, digest):
+        # A memoryview slice of the mapping; nothing is copied
+        self.view = view
+        self.remaining = len(view)
+        self.shoe_id = shoe_id
+        self.digest = digest
+
+    def deal_code(self):
+        if self.remaining <= 0:
+            raise IndexError("deal from empty shoe")
+        self.remaining -= 1
+        return self.view[self.remaining]
+
+    def deal_card(self):
+        if self.remaining <= 0:
+            raise IndexError("deal from empty shoe")
+        self.remaining -= 1
+        return CARDS[self.view[self.remaining]]
+
+    @property
+    def cards(self):
+        """The undealt cards as a list, in Deck.cards order (coaching and snapshots read this)"""
+        return [CARDS[code] for code in self.view[:self.remaining]]
+
+    def __len__(self):
+        return self.remaining
+
+
+class ShoeFile:
+    """Read-only memory map of a shoe file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.decks, self.cards_per_shoe, self.count, self.batch, seed = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} shoe file")
+        self.seed = int.from_bytes(seed, "little")
+        self.record_size = DIGEST_SIZE + self.cards_per_shoe
+        if len(self._map) != HEADER.size + self.count * self.record_size:
+            raise ValueError(f"{path} is truncated or has trailing data")
+        self._view = memoryview(self._map)
+
+    def __len__(self):
+        return self.count
+
+    def digest(self, shoe_id):
+        start = HEADER.size + shoe_id * self.record_size
+        return bytes(self._view[start:start + DIGEST_SIZE])
+
+    def cards(self, shoe_id):
+        """Zero-copy view of one shoe's card codes"""
+        if not 0 <= shoe_id < self.count:
+            raise IndexError(f"shoe {shoe_id} out of range")
+        start = HEADER.size + shoe_id * self.record_size + DIGEST_SIZE
+        return self._view[start:start + self.cards_per_shoe]
+
+    def deck(self, shoe_id):
+        return MappedDeck(self.cards(shoe_id), shoe_id, self.digest(shoe_id))
+
+    def close(self):
+        try:
+            self._view.release()
+            self._map.close()
+        except BufferError:
+            # Decks still dealing from the map keep it open; it is unmapped once the last one is gone
+            pass
+        self._file.close()
+
+
+class ShoePool:
+    """Hands out each shoe of a file once, remembering the next one in <path>.next across runs"""
+
+    def __init__(self, path):
+        self.shoes = ShoeFile(path)
+        self.cursor_path = path + ".next"
+        try:
+            with open(self.cursor_path, "r") as f:
+                self.next_shoe = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            self.next_shoe = 0
+
+    def next_deck(self):
+        """The next unused shoe, or None once the file is used up"""
+        if self.next_shoe >= len(self.shoes):
+            return None
+        deck = self.shoes.deck(self.next_shoe)
+        self.next_shoe += 1
+        tmp_path = self.cursor_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(self.next_shoe))
+        os.replace(tmp_path, self.cursor_path)
+        return deck
+
+    def close(self):
+        self.shoes.close()
+
+
+def verify(path, regenerate=False):
+    """Audit a shoe file. Returns (file digest, list of problems); no problems means it passed."""
+    shoes = ShoeFile(path)
+    full = bytes(sorted(list(range(52)) * shoes.decks))
+    problems = []
+    file_digest = hashlib.sha256()
+    expected = _shuffled_batches(shoes.decks, shoes.count, shoes.seed, shoes.batch) if regenerate else None
+    block, row = None, 0
+    for shoe_id in range(shoes.count):
+        digest = shoes.digest(shoe_id)
+        file_digest.update(digest)
+        with shoes.cards(shoe_id) as cards:
+            if shoe_digest(cards) != digest:
+                problems.append(f"shoe {shoe_id}: hash mismatch")
+            if bytes(sorted(cards)) != full:
+                problems.append(f"shoe {shoe_id}: not a complete {shoes.decks}-deck shoe")
+            if expected is not None:
+                if block is None or row == len(block):
+                    _, block = next(expected)
+                    row = 0
+                if block[row].tobytes() != cards:
+                    problems.append(f"shoe {shoe_id}: differs from the shoe its seed generates")
+                row += 1
+    shoes.close()
+    return file_digest.hexdigest(), problems
+
+
+def from_environment(argv=None):
+    """Open a ShoePool if --shoe-file FILE or PALACE_SHOE_FILE=FILE asks for one"""
+    argv = sys.argv[1:] if argv is None else argv
+    path = os.environ.get("PALACE_SHOE_FILE")
+    if "--shoe-file" in argv:
+        index = argv.index("--shoe-file")
+        if index + 1 < len(argv):
+            path = argv[index + 1]
+    return ShoePool(path) if path else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate and audit pre-shuffled BlackJack Palace shoe files")
+    commands = parser.add_subparsers(dest="command", required=True)
+    make = commands.add_parser("generate", help="write a file of shuffled shoes")
+    make.add_argument("path")
+    make.add_argument("--shoes", type=int, default=100000)
+    make.add_argument("--decks", type=int, default=1)
+    make.add_argument("--seed", type=int, help="generator seed (default: fresh from the OS)")
+    audit = commands.add_parser("verify", help="check every shoe's hash and contents")
+    audit.add_argument("path")
+    audit.add_argument("--regenerate", action="store_true", help="also regenerate every shoe from the recorded seed")
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        began = time.perf_counter()
+        digest = generate(args.path, args.shoes, args.decks, args.seed)
+        print(f"Wrote {args.shoes} shoes to {args.path} in {time.perf_counter() - began:.1f} s; file digest {digest}")
+        return
+    digest, problems = verify(args.path, args.regenerate)
+    for problem in problems[:50]:
+        print(problem)
+    print(f"{args.path}: {'FAILED, ' + str(len(problems)) + ' problems' if problems else 'OK'}; file digest {digest}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
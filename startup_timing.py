@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+
+'''
+Lightweight startup timing for BlackJack Palace.
+Import this module first; it records a mark at import time and lets the rest of the
+startup path add labelled marks. Enable the printed report with --startup-report or
+by setting PALACE_STARTUP_REPORT=1.
+'''
+
+_START = time.perf_counter()
+_marks = [("start", _START)]
+
+
+def mark(label):
+    """Record that a startup phase just finished"""
+    _marks.append((label, time.perf_counter()))
+
+
+def enabled(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    return "--startup-report" in argv or os.environ.get("PALACE_STARTUP_REPORT", "") not in ("", "0")
+
+
+def report():
+    """Return a text report of every phase with its own and cumulative duration in ms"""
+    lines = ["Startup timing (ms):", f"  {'phase':<28}{'step':>10}{'total':>10}"]
+    previous = _START
+    for label, t in _marks[1:]:
+        lines.append(f"  {label:<28}{(t - previous) * 1000:10.1f}{(t - _START) * 1000:10.1f}")
+        previous = t
+    return '\n'.join(lines)
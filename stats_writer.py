@@ -0,0 +1,152 @@
+import atexit
+import os
+import threading
+import time
+
+from leaderboard_store import iter_player_records, write_player_records
+
+'''
+Background leaderboard writer for BlackJack Palace.
+The Tk thread hands over copies of changed player records and asks for a commit; a
+writer thread streams the file through to a replacement, swapping in changed players'
+records and appending new ones, so it never holds a second copy of the leaderboard and
+slow disks never freeze the UI during settlement. Updates for the same player that
+arrive before the next write replace each other, so a burst of rounds costs one write.
+At most max_pending distinct players can be waiting: past that, update() blocks until
+the writer catches up. close() flushes everything and stops the thread.
+'''
+
+DEFAULT_MAX_PENDING = 1000
+
+
+def copy_record(record):
+    """A copy the writer thread can own (badge lists are shared with live Player objects)"""
+    return {
+        "wins": record["wins"],
+        "badges": list(record["badges"]),
+        "achievements": {ach: list(entry) for ach, entry in record["achievements"].items()},
+    }
+
+
+class StatsWriter:
+    def __init__(self, path, max_pending=DEFAULT_MAX_PENDING, on_write=None):
+        self.path = path
+        self.max_pending = max_pending
+        # Called with the duration of each file write in ns (e.g. Profiler.record)
+        self.on_write = on_write
+        self._pending = {}
+        # Records from a batch whose write failed, kept for the next attempt
+        self._unwritten = {}
+        self._commit = False
+        self._closing = False
+        self._lock = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="stats-writer", daemon=True)
+        # Metrics
+        self.max_depth = 0
+        self.writes = 0
+        self.write_errors = 0
+        self.last_error = None
+        self.write_ns_total = 0
+        self.write_ns_max = 0
+        self.blocked = 0
+        self.blocked_ns = 0
+
+    def start(self):
+        self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    def update(self, name, record, commit=False):
+        """Queue a player's record for the next write, waiting if the queue is full"""
+        record = copy_record(record)
+        with self._lock:
+            if name not in self._pending and len(self._pending) >= self.max_pending:
+                self.blocked += 1
+                # A full queue is written out without waiting for the next commit
+                self._commit = True
+                self._lock.notify_all()
+                start = time.perf_counter_ns()
+                while name not in self._pending and len(self._pending) >= self.max_pending and self._thread.is_alive():
+                    self._lock.wait()
+                self.blocked_ns += time.perf_counter_ns() - start
+            self._pending[name] = record
+            self.max_depth = max(self.max_depth, len(self._pending))
+            self._commit = self._commit or commit
+            self._lock.notify_all()
+
+    def commit(self):
+        """Ask for everything queued so far to be written"""
+        with self._lock:
+            self._commit = True
+            self._lock.notify_all()
+
+    def close(self):
+        """Write whatever is still queued, then stop the writer thread"""
+        with self._lock:
+            if self._closing:
+                return
+            self._closing = True
+            self._lock.notify_all()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    @property
+    def depth(self):
+        return len(self._pending)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not (self._commit or self._closing):
+                    self._lock.wait()
+                batch, self._pending = self._pending, {}
+                self._commit = False
+                closing = self._closing
+                # Room in the queue again for any update() waiting on backpressure
+                self._lock.notify_all()
+            if batch or self._unwritten:
+                self._write(batch)
+            if closing:
+                with self._lock:
+                    if not self._pending:
+                        return
+
+    def _merged(self, changed):
+        """Every record in the file with changed ones swapped in, then the new players"""
+        remaining = dict(changed)
+        if os.path.exists(self.path):
+            for name, record in iter_player_records(self.path):
+                yield name, remaining.pop(name, record)
+        yield from remaining.items()
+
+    def _write(self, batch):
+        changed, self._unwritten = self._unwritten, {}
+        changed.update(batch)
+        start = time.perf_counter_ns()
+        try:
+            # Streams the old file into a temporary one that then replaces it
+            write_player_records(self.path, self._merged(changed))
+        except Exception as exc:
+            # Keep the changes and try again on the next commit
+            self._unwritten = changed
+            self.write_errors += 1
+            self.last_error = exc
+            return
+        elapsed = time.perf_counter_ns() - start
+        self.writes += 1
+        self.write_ns_total += elapsed
+        self.write_ns_max = max(self.write_ns_max, elapsed)
+        if self.on_write:
+            self.on_write(elapsed)
+
+    def metrics(self):
+        return {
+            "queue_depth": self.depth,
+            "max_queue_depth": self.max_depth,
+            "writes": self.writes,
+            "write_errors": self.write_errors,
+            "mean_write_ms": self.write_ns_total / self.writes / 1e6 if self.writes else 0.0,
+            "max_write_ms": self.write_ns_max / 1e6,
+            "blocked_updates": self.blocked,
+            "blocked_ms": self.blocked_ns / 1e6,
+        }
@@ -0,0 +1,32 @@
+from game_clock import VirtualClock, RealClock, from_environment
+
+
+def test_cancel_then_advance_stops_at_target():
+    clock = VirtualClock()
+    fired = []
+    first = clock.after(100, fired.append, "a")
+    clock.after(5000, fired.append, "b")
+    clock.after_cancel(first)
+    clock.advance(200)
+    assert fired == []
+    assert clock.now == 200
+    clock.advance(4800)
+    assert fired == ["b"]
+    assert clock.now == 5000
+
+
+def test_advance_runs_due_callbacks_in_order():
+    clock = VirtualClock()
+    fired = []
+    clock.after(300, fired.append, 3)
+    clock.after(100, fired.append, 1)
+    clock.after(200, fired.append, 2)
+    clock.advance(250)
+    assert fired == [1, 2]
+    assert clock.pending() == 1
+
+
+def test_bad_speed_falls_back_to_real_time():
+    assert isinstance(from_environment(object(), ["--speed", "fast"]), RealClock)
+    assert isinstance(from_environment(object(), ["--speed"]), RealClock)
+    assert isinstance(from_environment(object(), ["--speed", "0"]), VirtualClock)
@@ -0,0 +1,87 @@
+import glob
+import json
+import os
+
+'''
+Card themes, card glyphs and shared fonts for BlackJack Palace.
+Theme packs are JSON files in themes/ ({"themes": [{"id", "name", "emoji"}, ...]}); drop in a
+new file to add suites. Packs are read the first time a theme is needed, every string a card
+draw uses is built once up front, and fonts are created once as tkinter.font.Font objects and
+shared by every widget, so drawing a card never rebuilds strings or makes Tk resolve a font.
+'''
+
+THEME_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "themes")
+DEFAULT_THEME = "bow"
+
+SUIT_EMOJIS = {
+    'Hearts': '❤️',
+    'Diamonds': '💎',
+    'Clubs': '♣️',
+    'Spades': '♠️'
+}
+RANK_EMOJIS = {
+    'J': '🧑',
+    'Q': '👸',
+    'K': '🤴',
+    'A': '🅰️'
+}
+
+
+def _card_glyphs():
+    glyphs = {}
+    for suit, suit_emoji in SUIT_EMOJIS.items():
+        for rank in ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']:
+            emoji = RANK_EMOJIS.get(rank, '') + suit_emoji
+            # Center: for face cards, show emoji; for number cards, show suit
+            center = emoji if rank in RANK_EMOJIS else emoji[-1]
+            glyphs[(rank, suit)] = (emoji, f"{rank}{emoji}", center)
+    return glyphs
+
+
+# (rank, suit) -> (card emoji, corner text, center text)
+CARD_GLYPHS = _card_glyphs()
+
+
+class Theme:
+    def __init__(self, theme_id, name, emoji):
+        self.id = theme_id
+        self.name = name
+        self.emoji = emoji
+        self.suite_label = f"Current Suite: {name}"
+
+
+class ThemeRegistry:
+    def __init__(self, root=None, theme_dir=THEME_DIR):
+        self.root = root
+        self.theme_dir = theme_dir
+        self._themes = None
+        self._fonts = {}
+
+    @property
+    def themes(self):
+        """Themes by id, in pack order, read from the theme packs on first use"""
+        if self._themes is None:
+            themes = {}
+            for path in sorted(glob.glob(os.path.join(self.theme_dir, "*.json"))):
+                with open(path, "r", encoding="utf-8") as f:
+                    for entry in json.load(f)["themes"]:
+                        themes[entry["id"]] = Theme(entry["id"], entry["name"], entry["emoji"])
+            self._themes = themes
+        return self._themes
+
+    def get(self, theme_id):
+        themes = self.themes
+        return themes.get(theme_id) or themes[DEFAULT_THEME]
+
+    def card_glyphs(self, card):
+        return CARD_GLYPHS[(card.rank, card.suit)]
+
+    def font(self, family, size, weight="normal"):
+        """A shared tkinter Font for this family/size/weight"""
+        key = (family, size, weight)
+        font = self._fonts.get(key)
+        if font is None:
+            from tkinter import font as tkfont
+            font = tkfont.Font(root=self.root, family=family, size=size, weight=weight)
+            self._fonts[key] = font
+        return font
@@ -0,0 +1,62 @@
+import tkinter as tk
+
+'''
+Scrolling list widget for BlackJack Palace screens that can hold any number of rows.
+Only the visible rows get a tk.Label; scrolling re-fills the same labels from a paged
+fetch(offset, limit) callback, so building and scrolling cost the same for ten players
+or ten million.
+'''
+
+
+class VirtualList(tk.Frame):
+    def __init__(self, parent, row_count, fetch, visible_rows=10, font=None, bg="#fff6fa", fg="#9933cc", width=45):
+        super().__init__(parent, bg=bg)
+        self.row_count = row_count
+        self.fetch = fetch
+        self.visible_rows = min(visible_rows, row_count)
+        self.offset = 0
+
+        rows_frame = tk.Frame(self, bg=bg)
+        rows_frame.pack(side=tk.LEFT, fill="both", expand=True)
+        # A fixed width keeps the list from jumping around as longer names scroll into view
+        self.labels = [tk.Label(rows_frame, bg=bg, fg=fg, font=font, anchor="w", width=width) for _ in range(self.visible_rows)]
+        for label in self.labels:
+            label.pack(fill="x", padx=10)
+
+        self.scrollbar = None
+        if row_count > self.visible_rows:
+            self.scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+            self.scrollbar.pack(side=tk.RIGHT, fill="y")
+            for widget in [self, rows_frame] + self.labels:
+                widget.bind("<MouseWheel>", self.on_mouse_wheel)
+                # X11 reports the wheel as buttons 4 and 5
+                widget.bind("<Button-4>", lambda event: self.scroll_to(self.offset - 1))
+                widget.bind("<Button-5>", lambda event: self.scroll_to(self.offset + 1))
+        self.refresh()
+
+    @property
+    def max_offset(self):
+        return self.row_count - self.visible_rows
+
+    def scroll_to(self, offset):
+        offset = max(0, min(int(offset), self.max_offset))
+        if offset != self.offset:
+            self.offset = offset
+            self.refresh()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(round(float(amount) * self.row_count))
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self.scroll_to(self.offset + int(amount) * step)
+
+    def on_mouse_wheel(self, event):
+        self.scroll_to(self.offset + (-1 if event.delta > 0 else 1))
+
+    def refresh(self):
+        """Fill the row labels with the page starting at the current offset"""
+        for label, text in zip(self.labels, self.fetch(self.offset, self.visible_rows)):
+            label.configure(text=text)
+        if self.scrollbar is not None:
+            self.scrollbar.set(self.offset / self.row_count, (self.offset + self.visible_rows) / self.row_count)